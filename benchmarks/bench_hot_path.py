@@ -0,0 +1,210 @@
+#bench_hot_path.py
+# Times the detection -> OCR -> correction -> lookup hot path and prints one JSON report.
+#   python -m benchmarks.bench_hot_path --frames 100 --output bench.json
+#   python -m benchmarks.bench_hot_path --skip-models     (pure-Python and OpenCV stages only)
+# Database stages call utils.database_utils against PostgreSQL when DB_* is configured, otherwise against an in-memory SQLite stand-in.
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import string
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import cv2
+from config import CONFIDENCE_THRESHOLD, DB_NAME
+from utils.detection_utils import expand_box, iter_frames, process_frame
+from utils.ocr_utils import preprocess_for_ocr, smart_correct_ocr_text, try_ocr_with_retries
+from utils.plate_formats import plate_validator, validate_plate
+
+DEFAULT_VIDEO = os.path.join("data", "temp_video.mp4")
+
+
+def peak_rss_mb():
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is KiB on Linux and bytes on macOS.
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        import psutil
+        info = psutil.Process().memory_info()
+        return getattr(info, "peak_wset", info.rss) / (1024 * 1024)
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+def measure(name, fn, inputs, warmup=1):
+    inputs = list(inputs)
+    for args in inputs[:warmup]:
+        fn(*args)
+    latencies = []
+    for args in inputs:
+        start = time.perf_counter()
+        fn(*args)
+        latencies.append(time.perf_counter() - start)
+    total = sum(latencies)
+    return {
+        "name": name,
+        "calls": len(latencies),
+        "ops_per_sec": round(len(latencies) / total, 2) if total else None,
+        "mean_ms": round(total / len(latencies) * 1000, 4),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 4),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 4),
+    }
+
+def random_plate(rng):
+    letters = string.ascii_uppercase
+    return (rng.choice(["JH", "MH", "OD", "WB", "DL"]) + f"{rng.randint(1, 99):02d}"
+            + "".join(rng.choice(letters) for _ in range(2)) + f"{rng.randint(0, 9999):04d}")
+
+def misread(plate, rng):
+    swaps = {"0": "O", "1": "I", "5": "S", "8": "B", "D": "0"}
+    chars = list(plate)
+    i = rng.randrange(len(chars))
+    chars[i] = swaps.get(chars[i], chars[i])
+    return "".join(chars)
+
+def load_frames(path, count):
+    cap = cv2.VideoCapture(path)
+    frames = []
+    for frame in iter_frames(cap):
+        frames.append(frame)
+        if len(frames) >= count:
+            break
+    cap.release()
+    return frames
+
+def center_crop(frame):
+    h, w = frame.shape[:2]
+    return frame[h // 3: h // 3 + max(40, h // 8), w // 3: w // 3 + max(120, w // 4)]
+
+
+def bench_pure(rng, calls, registered):
+    boxes = [((rng.randint(0, 500), rng.randint(0, 300), rng.randint(600, 900), rng.randint(350, 500)), (720, 1280, 3))
+             for _ in range(calls)]
+    texts = [misread(rng.choice(sorted(registered)), rng) for _ in range(calls)]
+    return [
+        measure("expand_box", expand_box, boxes),
+        measure("smart_correct_ocr_text", smart_correct_ocr_text, [(text,) for text in texts]),
+        measure("smart_correct_ocr_text[registered]", smart_correct_ocr_text, [(text, registered) for text in texts]),
+        measure("validate_plate", validate_plate, [(text,) for text in texts]),
+    ]
+
+def bench_frames(frames, skip_models):
+    crops = [(center_crop(frame),) for frame in frames]
+    results = [measure("preprocess_for_ocr", preprocess_for_ocr, crops)]
+    if skip_models:
+        return results
+    from utils.ocr_utils import get_model, get_ocr_model, warm_up_models
+    warm_up_models()
+    model, ocr_model = get_model(), get_ocr_model()
+    results.append(measure("try_ocr_with_retries", try_ocr_with_retries, [(crop, ocr_model) for crop, in crops]))
+    results.append(measure("process_frame", process_frame, [
+        (frame, model, ocr_model, plate_validator, CONFIDENCE_THRESHOLD, smart_correct_ocr_text, try_ocr_with_retries)
+        for frame in frames
+    ]))
+    return results
+
+def bench_database(rng, calls, writes):
+    # Same stage names for PostgreSQL and the SQLite stand-in; both run the real utils.database_utils functions.
+    from utils import database_utils as db
+    plates = sorted(db.get_registered_plates()) or [random_plate(rng)]
+    lookups = [(rng.choice(plates) if rng.random() < 0.5 else random_plate(rng),) for _ in range(calls)]
+    db.load_plate_index()
+    results = [measure("check_plate_in_database", db.check_plate_in_database, lookups)]
+    if writes:
+        now = datetime.now()
+        visits = [(plate, now.date().isoformat(), now.strftime("%H:%M:%S")) for plate, in lookups]
+        results.append(measure("add_visitor_entry", db.add_visitor_entry, visits))
+    results += [
+        measure("load_plate_index", db.load_plate_index, [()] * max(3, calls // 50)),
+        measure("get_all_registered_vehicles", db.get_all_registered_vehicles, [()] * max(3, calls // 50)),
+    ]
+    return results
+
+
+class SqliteCursor(sqlite3.Cursor):
+    # database_utils is written against psycopg2: context-managed cursors and %s placeholders.
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def execute(self, sql, params=()):
+        return super().execute(sql.replace("%s", "?"), params)
+
+
+class SqliteConnection(sqlite3.Connection):
+    def cursor(self, factory=SqliteCursor):
+        return super().cursor(factory)
+
+
+def use_sqlite(rng, vehicles):
+    from utils import database_utils as db
+    conn = sqlite3.connect(":memory:", factory=SqliteConnection, check_same_thread=False)
+    conn.execute("CREATE TABLE registeredvehicles (name TEXT, personalno TEXT, passno TEXT, vehicleno TEXT)")
+    conn.execute("CREATE UNIQUE INDEX registeredvehicles_vehicleno_key ON registeredvehicles (vehicleno)")
+    conn.execute("CREATE TABLE visitor (vehicleno TEXT, visitdate TEXT, visittime TEXT)")
+    plates = sorted({random_plate(rng) for _ in range(vehicles)})
+    conn.executemany("INSERT INTO registeredvehicles VALUES (?, ?, ?, ?)",
+                     [(f"Employee {i}", f"P{i:06d}", f"PASS{i:06d}", plate) for i, plate in enumerate(plates)])
+    conn.commit()
+    db.use_connection_factory(lambda: conn)
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the plate recognition hot path.")
+    parser.add_argument("--video", default=DEFAULT_VIDEO, help="clip used for the frame-level stages")
+    parser.add_argument("--frames", type=int, default=50, help="frames to decode from the clip")
+    parser.add_argument("--calls", type=int, default=2000, help="calls for the cheap per-plate stages")
+    parser.add_argument("--vehicles", type=int, default=3000, help="size of the synthetic registered set")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--skip-models", action="store_true", help="skip YOLO/PaddleOCR stages")
+    parser.add_argument("--sqlite", action="store_true", help="use the SQLite stand-in even if DB_* is set")
+    parser.add_argument("--db-writes", action="store_true",
+                        help="also time add_visitor_entry (inserts rows into the visitor table on PostgreSQL)")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    registered = frozenset(random_plate(rng) for _ in range(args.vehicles))
+    frames = load_frames(args.video, args.frames)
+    results = bench_pure(rng, args.calls, registered)
+    if frames:
+        results += bench_frames(frames, args.skip_models)
+    if args.sqlite or not DB_NAME:
+        use_sqlite(rng, args.vehicles)
+    results += bench_database(rng, args.calls, args.db_writes)
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "frames": len(frames),
+        "results": results,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#compare_detectors.py
+# Runs the PyTorch detector and an ONNX export over the same frames and reports latency and agreement.
+#   python -m benchmarks.compare_detectors --onnx model/best.onnx --frames 200 --threads 4
+#   python -m benchmarks.compare_detectors --onnx model/best.int8.onnx --imgsz 480 --output compare.json
+# PyTorch boxes are the reference: recall = share of them the ONNX model also finds (IoU >= --iou).
+import argparse
+import json
+import time
+
+from config import CONFIDENCE_THRESHOLD, DETECTION_IMGSZ, MODEL_PATH, ONNX_MODEL_PATH
+from utils.detection_utils import detect_plates
+from utils.tracking import box_iou
+from benchmarks.bench_hot_path import DEFAULT_VIDEO, load_frames, percentile, peak_rss_mb, git_commit
+
+
+def run(name, model, frames, imgsz, warmup=3):
+    for frame in frames[:warmup]:
+        detect_plates([frame], model, CONFIDENCE_THRESHOLD, imgsz=imgsz)
+    latencies, detections = [], []
+    for frame in frames:
+        start = time.perf_counter()
+        detections.append(detect_plates([frame], model, CONFIDENCE_THRESHOLD, imgsz=imgsz)[0])
+        latencies.append(time.perf_counter() - start)
+    total = sum(latencies)
+    return detections, {
+        "name": name,
+        "fps": round(len(latencies) / total, 2),
+        "mean_ms": round(total / len(latencies) * 1000, 2),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+    }
+
+def agreement(reference, candidate, iou_threshold):
+    matched, ious, conf_deltas = 0, [], []
+    reference_total = sum(len(boxes) for boxes in reference)
+    candidate_total = sum(len(boxes) for boxes in candidate)
+    for ref_boxes, cand_boxes in zip(reference, candidate):
+        unused = list(cand_boxes)
+        for ref in sorted(ref_boxes, key=lambda box: -box[4]):
+            best = max(unused, key=lambda box: box_iou(ref, box), default=None)
+            if best is None or box_iou(ref, best) < iou_threshold:
+                continue
+            unused.remove(best)
+            matched += 1
+            ious.append(box_iou(ref, best))
+            conf_deltas.append(abs(ref[4] - best[4]))
+    return {
+        "reference_boxes": reference_total,
+        "candidate_boxes": candidate_total,
+        "recall": round(matched / reference_total, 4) if reference_total else None,
+        "precision": round(matched / candidate_total, 4) if candidate_total else None,
+        "mean_iou": round(sum(ious) / len(ious), 4) if ious else None,
+        "mean_conf_delta": round(sum(conf_deltas) / len(conf_deltas), 4) if conf_deltas else None,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the PyTorch and ONNX Runtime plate detectors.")
+    parser.add_argument("--video", default=DEFAULT_VIDEO)
+    parser.add_argument("--frames", type=int, default=100)
+    parser.add_argument("--weights", default=MODEL_PATH)
+    parser.add_argument("--onnx", default=ONNX_MODEL_PATH)
+    parser.add_argument("--imgsz", type=int, default=DETECTION_IMGSZ)
+    parser.add_argument("--threads", type=int, default=0, help="ONNX Runtime intra-op threads (0 = runtime default)")
+    parser.add_argument("--iou", type=float, default=0.5, help="IoU needed for two boxes to count as the same plate")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    from ultralytics import YOLO
+    from utils.onnx_detector import OnnxDetector
+    frames = load_frames(args.video, args.frames)
+    if not frames:
+        parser.error(f"no frames decoded from {args.video}")
+    torch_boxes, torch_stats = run("torch", YOLO(args.weights), frames, args.imgsz)
+    onnx_boxes, onnx_stats = run("onnx", OnnxDetector(args.onnx, threads=args.threads), frames, args.imgsz)
+    report = {
+        "commit": git_commit(),
+        "frames": len(frames),
+        "imgsz": args.imgsz,
+        "onnx_model": args.onnx,
+        "threads": args.threads,
+        "results": [torch_stats, onnx_stats],
+        "speedup": round(torch_stats["mean_ms"] / onnx_stats["mean_ms"], 2),
+        "agreement": agreement(torch_boxes, onnx_boxes, args.iou),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,5 +7,65 @@ DB_USER = os.environ.get("DB_USER")
 DB_HOST = os.environ.get("DB_HOST")
 DB_PORT = os.environ.get("DB_PORT")
 MODEL_PATH = r"E:\ANPD\model\best.pt"
-PLATE_PATTERN = r'^[A-Z]{2}[0-9]{1,2}[A-Z]{1,2}[0-9]{4}$'
+PLATE_FORMATS = os.environ.get("PLATE_FORMATS", "standard,bh,temporary,legacy").split(",")
 CONFIDENCE_THRESHOLD = 0.4
+DB_POOL_MIN = int(os.environ.get("DB_POOL_MIN", 2))
+DB_POOL_MAX = int(os.environ.get("DB_POOL_MAX", 5))
+DB_HEALTH_CHECK_INTERVAL = float(os.environ.get("DB_HEALTH_CHECK_INTERVAL", 30))
+DB_CONNECT_TIMEOUT = int(os.environ.get("DB_CONNECT_TIMEOUT", 5))
+DB_RETRY_INTERVAL = float(os.environ.get("DB_RETRY_INTERVAL", 30))
+PLATE_INDEX_TTL = float(os.environ.get("PLATE_INDEX_TTL", 300))
+VISITOR_DEDUP_SECONDS = float(os.environ.get("VISITOR_DEDUP_SECONDS", 60))
+VISITOR_FLUSH_INTERVAL = float(os.environ.get("VISITOR_FLUSH_INTERVAL", 2))
+VISITOR_BATCH_SIZE = int(os.environ.get("VISITOR_BATCH_SIZE", 100))
+PIPELINE_QUEUE_SIZE = int(os.environ.get("PIPELINE_QUEUE_SIZE", 4))
+OCR_WORKERS = int(os.environ.get("OCR_WORKERS", 1))
+TRACK_IOU_THRESHOLD = float(os.environ.get("TRACK_IOU_THRESHOLD", 0.3))
+TRACK_MAX_MISSES = int(os.environ.get("TRACK_MAX_MISSES", 15))
+TRACK_MIN_VOTES = int(os.environ.get("TRACK_MIN_VOTES", 3))
+TRACK_MIN_AGREEMENT = float(os.environ.get("TRACK_MIN_AGREEMENT", 0.6))
+OCR_VARIANTS = os.environ.get("OCR_VARIANTS", "upright,rotate_cw,rotate_ccw").split(",")
+OCR_RECOGNITION_ONLY = os.environ.get("OCR_RECOGNITION_ONLY", "0") == "1"
+OCR_REC_MIN_SCORE = float(os.environ.get("OCR_REC_MIN_SCORE", 0.5))
+PLATE_MATCH_MAX_EDITS = int(os.environ.get("PLATE_MATCH_MAX_EDITS", 2))
+PLATE_MATCH_MAX_COST = float(os.environ.get("PLATE_MATCH_MAX_COST", 0.8))
+MOTION_GATING = os.environ.get("MOTION_GATING", "1") == "1"
+MOTION_ROI = tuple(float(v) for v in os.environ.get("MOTION_ROI", "0,0,1,1").split(","))
+MOTION_SCALE = float(os.environ.get("MOTION_SCALE", 0.25))
+MOTION_PIXEL_THRESHOLD = int(os.environ.get("MOTION_PIXEL_THRESHOLD", 25))
+MOTION_MIN_CHANGED = float(os.environ.get("MOTION_MIN_CHANGED", 0.01))
+MOTION_HOLD_FRAMES = int(os.environ.get("MOTION_HOLD_FRAMES", 15))
+CAMERA_SOURCES = os.environ.get("CAMERA_SOURCES", "lane1=0")
+GATE_WORKERS = int(os.environ.get("GATE_WORKERS", 2))
+GATE_RESULTS_DIR = os.environ.get("GATE_RESULTS_DIR", "./data/lanes")
+TARGET_FPS = float(os.environ.get("TARGET_FPS", 10))
+MAX_DETECTION_STRIDE = int(os.environ.get("MAX_DETECTION_STRIDE", 5))
+DETECTION_IMGSZ = int(os.environ.get("DETECTION_IMGSZ", 640))
+MIN_DETECTION_IMGSZ = int(os.environ.get("MIN_DETECTION_IMGSZ", 320))
+UPLOAD_DIR = os.environ.get("UPLOAD_DIR", "./data")
+UPLOAD_CHUNK_SIZE = int(os.environ.get("UPLOAD_CHUNK_SIZE", 1024 * 1024))
+METRICS_PORT = int(os.environ.get("METRICS_PORT", 0))
+METRICS_FILE = os.environ.get("METRICS_FILE")
+PROFILE = os.environ.get("IVRS_PROFILE", "0") == "1"
+PROFILE_DIR = os.environ.get("IVRS_PROFILE_DIR", "./data/profiles")
+PAGE_SIZE = int(os.environ.get("PAGE_SIZE", 50))
+DETECTOR_BACKEND = os.environ.get("DETECTOR_BACKEND", "torch")
+ONNX_MODEL_PATH = os.environ.get("ONNX_MODEL_PATH", os.path.splitext(MODEL_PATH)[0] + ".onnx")
+ONNX_THREADS = int(os.environ.get("ONNX_THREADS", 0))
+ONNX_PROVIDERS = os.environ.get("ONNX_PROVIDERS", "CPUExecutionProvider").split(",")
+OCR_CACHE_SIZE = int(os.environ.get("OCR_CACHE_SIZE", 256))
+OCR_CACHE_MAX_DISTANCE = int(os.environ.get("OCR_CACHE_MAX_DISTANCE", 12))
+OCR_CACHE_HASH_SIZE = int(os.environ.get("OCR_CACHE_HASH_SIZE", 16))
+OCR_CACHE_TTL = float(os.environ.get("OCR_CACHE_TTL", 10))
+REPROCESS_WORKERS = int(os.environ.get("REPROCESS_WORKERS", max(1, (os.cpu_count() or 2) - 1)))
+REPROCESS_CHUNK_FRAMES = int(os.environ.get("REPROCESS_CHUNK_FRAMES", 1500))
+VOTE_WINDOW_SECONDS = float(os.environ.get("VOTE_WINDOW_SECONDS", 5))
+VOTE_HALF_LIFE = float(os.environ.get("VOTE_HALF_LIFE", 1.5))
+VOTE_ARRIVE_SCORE = float(os.environ.get("VOTE_ARRIVE_SCORE", 2.5))
+VOTE_DEPART_SECONDS = float(os.environ.get("VOTE_DEPART_SECONDS", 3))
+PREVIEW_MAX_WIDTH = int(os.environ.get("PREVIEW_MAX_WIDTH", 960))
+PREVIEW_MAX_FPS = float(os.environ.get("PREVIEW_MAX_FPS", 10))
+PREVIEW_JPEG_QUALITY = int(os.environ.get("PREVIEW_JPEG_QUALITY", 75))
+PROGRESS_INTERVAL = float(os.environ.get("PROGRESS_INTERVAL", 0.25))
+VIDEO_CODEC = os.environ.get("VIDEO_CODEC", "mp4v")
+VIDEO_WRITER_QUEUE = int(os.environ.get("VIDEO_WRITER_QUEUE", 64))
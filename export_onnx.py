@@ -0,0 +1,76 @@
+#export_onnx.py
+# Exports the plate detector for the ONNX Runtime backend (DETECTOR_BACKEND=onnx):
+#   python export_onnx.py                                   -> best.onnx next to MODEL_PATH
+#   python export_onnx.py --int8                            -> also best.int8.onnx (dynamic, weights only)
+#   python export_onnx.py --int8 --calibration data/temp_video.mp4   (static, activations calibrated on real frames)
+# Check the quantised model with benchmarks/compare_detectors.py before switching ONNX_MODEL_PATH to it.
+import argparse
+import os
+
+import cv2
+import numpy as np
+from config import MODEL_PATH, DETECTION_IMGSZ
+from utils.detection_utils import iter_frames
+from utils.onnx_detector import letterbox
+
+
+def calibration_reader(video, input_name, imgsz, count):
+    from onnxruntime.quantization import CalibrationDataReader
+
+    class VideoCalibration(CalibrationDataReader):
+        def __init__(self):
+            cap = cv2.VideoCapture(video)
+            frames = list(iter_frames(cap))
+            cap.release()
+            step = max(1, len(frames) // count)
+            self.samples = iter(frames[::step][:count])
+
+        def get_next(self):
+            frame = next(self.samples, None)
+            if frame is None:
+                return None
+            padded = letterbox(frame, imgsz)[0][:, :, ::-1].transpose(2, 0, 1)
+            return {input_name: np.ascontiguousarray(padded[None], dtype=np.float32) / 255.0}
+
+    return VideoCalibration()
+
+def quantize(path, output, calibration=None, imgsz=DETECTION_IMGSZ, samples=100):
+    from onnxruntime.quantization import QuantFormat, QuantType, quantize_dynamic, quantize_static
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+    prepared = output + ".prep.onnx"
+    quant_pre_process(path, prepared)
+    try:
+        if calibration:
+            import onnxruntime as ort
+            input_name = ort.InferenceSession(prepared, providers=["CPUExecutionProvider"]).get_inputs()[0].name
+            quantize_static(prepared, output, calibration_reader(calibration, input_name, imgsz, samples),
+                            quant_format=QuantFormat.QDQ, activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8,
+                            per_channel=True)
+        else:
+            quantize_dynamic(prepared, output, weight_type=QuantType.QUInt8)
+    finally:
+        os.remove(prepared)
+    return output
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the YOLO plate detector to ONNX (optionally INT8).")
+    parser.add_argument("--weights", default=MODEL_PATH)
+    parser.add_argument("--imgsz", type=int, default=DETECTION_IMGSZ)
+    parser.add_argument("--opset", type=int, default=17)
+    parser.add_argument("--static", action="store_true", help="fixed input size and batch 1 instead of dynamic axes")
+    parser.add_argument("--int8", action="store_true", help="also write an INT8-quantised copy")
+    parser.add_argument("--calibration", help="video used to calibrate static INT8 quantisation")
+    parser.add_argument("--calibration-frames", type=int, default=100)
+    args = parser.parse_args()
+
+    from ultralytics import YOLO
+    # dynamic=True keeps batch and image size free so the adaptive scheduler can still change imgsz.
+    path = YOLO(args.weights).export(format="onnx", imgsz=args.imgsz, dynamic=not args.static, simplify=True, opset=args.opset)
+    print(f"ONNX model written to {path}")
+    if args.int8:
+        output = quantize(path, os.path.splitext(path)[0] + ".int8.onnx", args.calibration, args.imgsz, args.calibration_frames)
+        print(f"INT8 model written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+#gate_server.py
+# Headless multi-lane gate service: python gate_server.py --sources "lane1=0;lane2=rtsp://cam2/stream"
+# Any source that is a file path is read frame by frame, which makes recorded clips a stand-in for cameras.
+import argparse
+import json
+import os
+import threading
+from datetime import datetime
+from multiprocessing import Pool
+
+import cv2
+from config import (
+    CAMERA_SOURCES, GATE_WORKERS, GATE_RESULTS_DIR, CONFIDENCE_THRESHOLD, MOTION_GATING,
+)
+from utils.database_utils import check_plate_in_database, get_registered_plates
+from utils.detection_utils import detect_plates, read_plates
+from utils.metrics import timed, set_gauge, start_metrics_server, write_metrics_file
+from utils.motion_utils import MotionGate
+from utils.ocr_utils import smart_correct_ocr_text, set_ocr_gauges
+from utils.pipeline import DropOldestQueue
+from utils.plate_formats import plate_validator
+from utils.tracking import PlateTracker
+from utils.voting import PlateVoter
+from utils.visitor_writer import get_visitor_writer
+
+
+def _init_worker():
+    from utils.ocr_utils import warm_up_models
+    warm_up_models()
+
+def _detect_task(frame):
+    from utils.ocr_utils import get_model
+    return detect_plates([frame], get_model(), CONFIDENCE_THRESHOLD)[0]
+
+def _ocr_task(crops, scopes=None):
+    from utils.ocr_utils import get_ocr_model, recognize_batch, get_ocr_variant_stats, get_ocr_cache_stats
+    reads = recognize_batch(crops, get_ocr_model(), scopes=scopes)
+    # Variant and cache counters live in the worker, so each call ships its latest totals back.
+    return reads, os.getpid(), get_ocr_variant_stats(), get_ocr_cache_stats()
+
+
+_worker_stats = {}
+_worker_stats_lock = threading.Lock()
+
+def _record_worker_stats(pid, variant_stats, cache_stats):
+    with _worker_stats_lock:
+        _worker_stats[pid] = (variant_stats, cache_stats)
+        snapshots = list(_worker_stats.values())
+    variants, caches = {}, {}
+    for worker_variants, worker_caches in snapshots:
+        for name, stats in worker_variants.items():
+            total = variants.setdefault(name, {"attempts": 0, "hits": 0})
+            total["attempts"] += stats["attempts"]
+            total["hits"] += stats["hits"]
+        for name, stats in worker_caches.items():
+            total = caches.setdefault(name, {"hits": 0, "near_hits": 0, "misses": 0})
+            for key in total:
+                total[key] += stats[key]
+    for total in variants.values():
+        total["hit_rate"] = total["hits"] / total["attempts"] if total["attempts"] else 0.0
+    set_ocr_gauges(variants, caches)
+
+
+def parse_sources(spec):
+    sources = {}
+    for entry in filter(None, (part.strip() for part in spec.split(";"))):
+        name, _, source = entry.partition("=")
+        sources[name.strip()] = int(source) if source.strip().isdigit() else source.strip()
+    return sources
+
+
+class Lane(threading.Thread):
+    def __init__(self, name, source, pool, output_dir):
+        super().__init__(name=f"lane-{name}", daemon=True)
+        self.lane = name
+        self.source = source
+        self.pool = pool
+        self.output_path = os.path.join(output_dir, f"{name}.jsonl")
+        self.live = not (isinstance(source, str) and os.path.isfile(source))
+        self.tracker = PlateTracker()
+        self.voter = PlateVoter()
+        self.motion_gate = MotionGate() if MOTION_GATING else None
+        self.published = set()
+        self.frames = 0
+        self.stop_event = threading.Event()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def _frames(self, cap):
+        if not self.live:
+            while not self.stop_event.is_set():
+                ret, frame = cap.read()
+                if not ret:
+                    return
+                yield frame
+            return
+        # Live sources: a grabber thread keeps only the newest frame so a slow lane never lags behind.
+        latest = DropOldestQueue(1)
+        done = threading.Event()
+
+        def grab():
+            while not self.stop_event.is_set():
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                latest.put(frame)
+            done.set()
+
+        threading.Thread(target=grab, name=f"{self.name}-grab", daemon=True).start()
+        while not (done.is_set() and not len(latest)):
+            frame = latest.get(timeout=0.5)
+            if frame is not None:
+                yield frame
+
+    def _recognize(self, crops, _ocr_model, scopes=None):
+        if not crops:
+            return []
+        with timed("lane.ocr"):
+            reads, pid, variant_stats, cache_stats = self.pool.apply(_ocr_task, (crops, scopes))
+        _record_worker_stats(pid, variant_stats, cache_stats)
+        return reads
+
+    def _write(self, event):
+        with open(self.output_path, "a") as f:
+            f.write(json.dumps(event) + "\n")
+        print(json.dumps(event))
+
+    def _publish_presence(self, events):
+        for event in events:
+            self._write({
+                "lane": self.lane,
+                "time": datetime.now().isoformat(timespec="seconds"),
+                "frame": self.frames,
+                "event": event["event"],
+                "plate": event["plate"],
+                "score": event["score"],
+            })
+
+    def _publish(self, tracks):
+        for track in tracks:
+            if track.track_id in self.published or not track.is_confident():
+                continue
+            self.published.add(track.track_id)
+            plate = track.plate
+            is_employee, pass_no = check_plate_in_database(plate)
+            if not is_employee:
+                get_visitor_writer().log(plate)
+            event = {
+                "lane": self.lane,
+                "time": datetime.now().isoformat(timespec="seconds"),
+                "frame": self.frames,
+                "track": track.track_id,
+                "plate": plate,
+                "registered": is_employee,
+                "pass_no": pass_no,
+            }
+            self._write(event)
+        self.published &= {track.track_id for track in self.tracker.tracks}
+
+    def run(self):
+        cap = cv2.VideoCapture(self.source)
+        try:
+            for frame in self._frames(cap):
+                self.frames += 1
+                x1, y1 = 0, 0
+                crop = frame
+                if self.motion_gate is not None:
+                    if not self.motion_gate.update(frame, force=bool(self.tracker.tracks)):
+                        # An idle frame can still be the one where the last vehicle counts as gone.
+                        self._publish_presence(self.voter.update())
+                        continue
+                    x1, y1, x2, y2 = self.motion_gate.roi_box(frame.shape)
+                    crop = frame[y1:y2, x1:x2]
+                # Only the ROI crop is shipped to the shared worker pool.
+                with timed("lane.detect"):
+                    boxes = self.pool.apply(_detect_task, (crop,))
+                detections = [(bx1 + x1, by1 + y1, bx2 + x1, by2 + y1, conf) for bx1, by1, bx2, by2, conf in boxes]
+                tracks = self.tracker.update(detections)
+                if detections:
+                    reads = read_plates(frame, detections, None, plate_validator, smart_correct_ocr_text, None,
+                                        registered_plates=get_registered_plates(), tracks=tracks,
+                                        recognize_batch=self._recognize)
+                    for plate, _, weight in reads:
+                        self._publish_presence(self.voter.vote(plate, weight))
+                    self._publish(tracks)
+                self._publish_presence(self.voter.update())
+                set_gauge("lane_frames_total", self.frames, lane=self.lane)
+                if self.frames % 100 == 0:
+                    write_metrics_file()
+        finally:
+            cap.release()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the plate recognition service for several gate lanes.")
+    parser.add_argument("--sources", default=CAMERA_SOURCES, help='e.g. "lane1=0;lane2=rtsp://host/stream;lane3=clip.mp4"')
+    parser.add_argument("--workers", type=int, default=GATE_WORKERS, help="detection/OCR worker processes shared by all lanes")
+    parser.add_argument("--output-dir", default=GATE_RESULTS_DIR, help="directory for per-lane <lane>.jsonl event files")
+    args = parser.parse_args()
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    start_metrics_server()
+    with Pool(args.workers, initializer=_init_worker) as pool:
+        lanes = [Lane(name, source, pool, args.output_dir) for name, source in parse_sources(args.sources).items()]
+        for lane in lanes:
+            lane.start()
+        try:
+            for lane in lanes:
+                while lane.is_alive():
+                    lane.join(0.5)
+        except KeyboardInterrupt:
+            for lane in lanes:
+                lane.stop()
+            for lane in lanes:
+                lane.join(5)
+    get_visitor_writer().close()
+    write_metrics_file()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,39 @@
 #main.py
 import streamlit as st
+import io
 import os
+import shutil
+import tempfile
+import uuid
 import pandas as pd
 from datetime import datetime
 import cv2
 from collections import Counter
-from config import CONFIDENCE_THRESHOLD
+from config import CONFIDENCE_THRESHOLD, OCR_WORKERS, UPLOAD_DIR, UPLOAD_CHUNK_SIZE, PAGE_SIZE, DB_RETRY_INTERVAL
 
 from utils.database_utils import (
     check_plate_in_database,
-    add_visitor_entry,
     add_registered_vehicle,
     delete_registered_vehicle,
-    get_all_registered_vehicles,
-    get_all_visitor_logs,
+    get_registered_plates,
+    get_registered_vehicles_page,
+    count_registered_vehicles,
+    get_visitor_logs_page,
+    get_visitor_log_stats,
+    ensure_indexes,
+    has_unique_vehicle_index,
+    get_duplicate_vehicle_numbers,
 )
 
+from utils.visitor_writer import get_visitor_writer
+from utils.vehicle_io import import_vehicles, export_table
+
 from utils.detection_utils import (
-    process_frame,
+    iter_frames,
+    iter_batches,
+    detect_plates,
+    read_plates_window,
+    find_plate_box,
     expand_box
 
 )
@@ -25,12 +41,87 @@ from utils.detection_utils import (
 from utils.ocr_utils import (
     smart_correct_ocr_text,
     try_ocr_with_retries,
+    recognize_batch,
+    set_ocr_gauges,
     preprocess_for_ocr,
-    model,
-    ocr_model
+    create_ocr_model,
+    get_model,
+    get_ocr_model,
+    warm_up_models,
 )
 
-plate_pattern = r"^[A-Z]{2}[0-9]{2}[A-Z]{1,2}[0-9]{4}$"
+from utils.pipeline import WebcamPipeline
+from utils.plate_formats import plate_validator
+from utils.tracking import PlateTracker
+from utils.voting import PlateVoter
+from utils.rendering import PreviewRenderer, ThrottledProgress, BackgroundVideoWriter, output_extension
+from utils.metrics import timed, set_gauge, start_metrics_server, write_metrics_file, profiled
+
+@st.cache_resource
+def load_models():
+    # Loaded once per server process, and only when a video page actually needs them.
+    report = warm_up_models()
+    print("Model startup: " + ", ".join(f"{name} {seconds:.2f}s" for name, seconds in report.items()))
+    return get_model(), get_ocr_model(), report
+
+@st.cache_resource
+def start_metrics():
+    # Prometheus text endpoint on METRICS_PORT; disabled when the port is 0.
+    return start_metrics_server()
+
+@st.cache_resource
+def get_ocr_worker_models(count):
+    # Shared by every session (element 0 is also the upload page's model); LockedOCR serialises
+    # calls per instance, and separate instances let one pipeline's OCR workers run in parallel.
+    return [get_ocr_model()] + [create_ocr_model() for _ in range(count - 1)]
+
+@st.cache_resource
+def _database_indexed():
+    # Indexes behind the paginated admin views and the CSV upsert. Raising keeps a failed attempt out of the cache.
+    if not ensure_indexes():
+        raise RuntimeError("database indexes incomplete")
+    return True
+
+@st.cache_resource(ttl=DB_RETRY_INTERVAL)
+def prepare_database():
+    # A failure (database down, duplicate plates) is retried after DB_RETRY_INTERVAL rather than cached for good.
+    try:
+        return _database_indexed()
+    except RuntimeError:
+        return False
+
+PAGE_SIZES = sorted({25, PAGE_SIZE, 100, 250})
+
+def page_cursors(view, filters):
+    # Keyset pagination: a stack of "after" cursors, reset whenever the filters change.
+    state = st.session_state.setdefault(f"{view}_pages", {"filters": None, "cursors": [None]})
+    if state["filters"] != filters:
+        state["filters"] = filters
+        state["cursors"] = [None]
+    return state["cursors"]
+
+def pager(view, next_cursor):
+    cursors = st.session_state[f"{view}_pages"]["cursors"]
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col1:
+        st.button("◀ Previous", key=f"{view}_prev", disabled=len(cursors) == 1, on_click=cursors.pop)
+    with col2:
+        st.caption(f"Page {len(cursors)}")
+    with col3:
+        st.button("Next ▶", key=f"{view}_next", disabled=next_cursor is None, on_click=cursors.append, args=(next_cursor,))
+
+def csv_export_button(table, label):
+    # COPY streams into a spooled temp file; only very large exports touch the disk.
+    if st.button(f"📤 Prepare {label} CSV", key=f"{table}_export"):
+        with tempfile.SpooledTemporaryFile(max_size=16 * 1024 * 1024) as f:
+            export_table(table, f)
+            f.seek(0)
+            data = f.read()
+        st.download_button(f"⬇️ Download {label} CSV", data, file_name=f"{table}_{datetime.now():%Y%m%d_%H%M%S}.csv",
+                           mime="text/csv", key=f"{table}_download")
+
+start_metrics()
+prepare_database()
 
 # --- Load custom CSS ---
 css_path = os.path.join("static", "style.css")
@@ -92,151 +183,166 @@ if selected_option == "🎥 Live Video Processing":
         </div>
         """, unsafe_allow_html=True)
         details_box = st.empty()
+        metrics_box = st.empty()
+
+    model, ocr_model, startup_report = load_models()
+    metrics_box.caption("Models ready: " + ", ".join(f"{name} {seconds:.2f}s" for name, seconds in startup_report.items()))
 
     # Webcam mode
     if input_mode == "Webcam":
         run_webcam = st.button("Start Webcam")
         if run_webcam:
             cap = cv2.VideoCapture(0)
-            plate_history = []
+            voter = PlateVoter()
             most_common_plate = None
             last_box = None
             is_employee, pass_no = None, None
-            visitor_logged = False
+            visitor_writer = get_visitor_writer()
             frame_count = 0
             max_no_detection = 15
             frames_since_seen = 0
+            preview = PreviewRenderer(stframe)
 
-            while True:
-                ret, frame = cap.read()
-                if not ret:
-                    break
-                processed, detected, box, found = process_frame(frame, model, ocr_model, plate_pattern, CONFIDENCE_THRESHOLD, smart_correct_ocr_text, try_ocr_with_retries, target_plate=most_common_plate, last_box=last_box)
-                if detected:
-                    plate_history.extend(detected)
-                    most_common_plate, _ = Counter(plate_history).most_common(1)[0]
-                    is_employee, pass_no = check_plate_in_database(most_common_plate)
-                    visitor_logged = False
-                    if not is_employee and not visitor_logged:
-                        visit_date = datetime.now().date()
-                        visit_time = datetime.now().time().strftime('%H:%M:%S')
-                        add_visitor_entry(most_common_plate, visit_date, visit_time)
-                        visitor_logged = True
-                    st.session_state.current_plate = most_common_plate
-                    st.session_state.vehicle_status = (is_employee, pass_no)
-                    st.session_state.detection_time = datetime.now()
-                if box and found:
-                    last_box = box
-                    frames_since_seen = 0
-                else:
-                    frames_since_seen += 1
-                if last_box and frames_since_seen < max_no_detection:
-                    x1, y1, x2, y2 = last_box
-                    color = (0, 255, 0) if is_employee else (0, 0, 255)
-                    thickness = 3
-                    cv2.rectangle(processed, (x1, y1), (x2, y2), color, thickness)
-                now = datetime.now()
+            pipeline = WebcamPipeline(cap, model, get_ocr_worker_models(OCR_WORKERS), plate_validator, CONFIDENCE_THRESHOLD, smart_correct_ocr_text, try_ocr_with_retries, registered_plates_fn=get_registered_plates, recognize_batch=recognize_batch).start()
+            try:
+                with profiled("webcam"):
+                    while True:
+                        results = pipeline.results()
+                        if not results:
+                            if pipeline.is_done():
+                                break
+                            continue
+                        events = []
+                        for _, _, reads in results:
+                            for plate, _, weight in reads:
+                                events.extend(voter.vote(plate, weight))
+                        events.extend(voter.update())
+                        # The database is only consulted when a vehicle arrives, not on every read.
+                        for event in events:
+                            print(f"Vehicle {event['event']}: {event['plate']} (score {event['score']})")
+                            if event["event"] == "arrived":
+                                most_common_plate = event["plate"]
+                                is_employee, pass_no = check_plate_in_database(most_common_plate)
+                                if not is_employee:
+                                    visitor_writer.log(most_common_plate)
+                                st.session_state.current_plate = most_common_plate
+                                st.session_state.vehicle_status = (is_employee, pass_no)
+                                st.session_state.detection_time = datetime.now()
+                            elif event["plate"] == most_common_plate:
+                                most_common_plate, last_box = None, None
+                                st.session_state.current_plate = None
+                        # Only the newest frame is rendered; older results just feed the vote
+                        _, processed, reads = results[-1]
+                        box = find_plate_box(reads, most_common_plate) if most_common_plate else None
+                        if box:
+                            last_box = box
+                            frames_since_seen = 0
+                        else:
+                            frames_since_seen += 1
+                        if last_box and frames_since_seen < max_no_detection:
+                            x1, y1, x2, y2 = last_box
+                            color = (0, 255, 0) if is_employee else (0, 0, 255)
+                            thickness = 3
+                            cv2.rectangle(processed, (x1, y1), (x2, y2), color, thickness)
+                        now = datetime.now()
                 
-                stframe.image(cv2.cvtColor(processed, cv2.COLOR_BGR2RGB), channels="RGB", use_container_width=True)
-                # Vehicle details
-                if st.session_state.current_plate:
-                    details_box.markdown(f"""
-                    <div class="status-card {'status-with-pass' if is_employee else 'status-without-pass'}">
-                        {'✅ Recognition Status: With PASS' if is_employee else '❌ Recognition Status: Without PASS'}
-                    </div>
-                    <div class="info-card">
-                        <p><strong>PASS No.:</strong> {pass_no if pass_no else 'N/A'}</p>
-                        <p><strong>Plate Number:</strong> {st.session_state.current_plate}</p>
-                        <p><strong>Date:</strong> {st.session_state.detection_time.strftime('%d/%m/%Y') if st.session_state.detection_time else 'N/A'}</p>
-                        <p><strong>Time:</strong> {st.session_state.detection_time.strftime('%H:%M:%S') if st.session_state.detection_time else 'N/A'}</p>
-                    </div>
-                    """, unsafe_allow_html=True)
-                else:
-                    details_box.markdown("""
-                    <div class="info-card">
-                        <p style="text-align: center; color: rgba(255,255,255,0.7);">
-                            No vehicle detected yet.
-                        </p>
-                    </div>
-                    """, unsafe_allow_html=True)
-                frame_count += 1
-                progress_bar.progress((frame_count % 100) / 100)
-            cap.release()
+                        frame_count += len(results)
+                        with timed("render"):
+                            shown = preview.show(processed, force=bool(events))
+                        # Details, progress and queue stats refresh at the preview rate, not per frame
+                        if shown:
+                            # Vehicle details
+                            if st.session_state.current_plate:
+                                details_box.markdown(f"""
+                                <div class="status-card {'status-with-pass' if is_employee else 'status-without-pass'}">
+                                    {'✅ Recognition Status: With PASS' if is_employee else '❌ Recognition Status: Without PASS'}
+                                </div>
+                                <div class="info-card">
+                                    <p><strong>PASS No.:</strong> {pass_no if pass_no else 'N/A'}</p>
+                                    <p><strong>Plate Number:</strong> {st.session_state.current_plate}</p>
+                                    <p><strong>Date:</strong> {st.session_state.detection_time.strftime('%d/%m/%Y') if st.session_state.detection_time else 'N/A'}</p>
+                                    <p><strong>Time:</strong> {st.session_state.detection_time.strftime('%H:%M:%S') if st.session_state.detection_time else 'N/A'}</p>
+                                </div>
+                                """, unsafe_allow_html=True)
+                            else:
+                                details_box.markdown("""
+                                <div class="info-card">
+                                    <p style="text-align: center; color: rgba(255,255,255,0.7);">
+                                        No vehicle detected yet.
+                                    </p>
+                                </div>
+                                """, unsafe_allow_html=True)
+                            progress_bar.progress((frame_count % 100) / 100)
+                            metrics = pipeline.metrics()
+                            metrics_box.caption(
+                                f"Queues: capture {metrics['capture']['depth']} · OCR {metrics['ocr']['depth']} · render {metrics['render']['depth']} | "
+                                f"dropped: {metrics['capture']['dropped'] + metrics['ocr']['dropped'] + metrics['render']['dropped']} | "
+                                f"tracks: {metrics['tracks']} · OCR skipped: {metrics['ocr_skipped']} · idle frames: {metrics['motion_skipped']} | "
+                                f"detect every {metrics['scheduler']['stride']} frame(s) at {metrics['scheduler']['imgsz']}px, "
+                                f"{metrics['scheduler']['latency_ms']} ms ({metrics['scheduler']['decision']})"
+                            )
+                            for stage in ("capture", "ocr", "render"):
+                                set_gauge("queue_depth", metrics[stage]["depth"], stage=stage)
+                                set_gauge("queue_dropped_total", metrics[stage]["dropped"], stage=stage)
+                            set_ocr_gauges()
+                        if frame_count % 100 < len(results):
+                            write_metrics_file()
+            finally:
+                pipeline.stop()
+                cap.release()
 
     # File Upload mode
     else:
         uploaded_video = st.file_uploader("Upload a Video", type=["mp4", "avi", "mov"], key="video_upload")
         if uploaded_video:
-            temp_video_path = r"./data/temp_video.mp4"
-            with open(temp_video_path, "wb") as f:
-                f.write(uploaded_video.read())
-            cap = cv2.VideoCapture(temp_video_path)
-            total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-            fps = int(cap.get(cv2.CAP_PROP_FPS))
-            width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-            height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-            out = cv2.VideoWriter("./data/output_detected.mp4", cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
-            batch_size = 40
-            plate_history = []
-            # First pass to detect plates
-            for i in range(0, total_frames, batch_size):
-                cap.set(cv2.CAP_PROP_POS_FRAMES, i)
-                for _ in range(batch_size):
-                    ret, frame = cap.read()
-                    if not ret:
-                        break
-                    _, detected, _, _ = process_frame(frame, model, ocr_model, plate_pattern, CONFIDENCE_THRESHOLD, smart_correct_ocr_text, try_ocr_with_retries)
-                    plate_history.extend(detected)
-                    progress_bar.progress(min(i / total_frames, 1.0))
-                if plate_history:
-                    break
-            cap.release()
-            if not plate_history:
-                st.markdown("""
-                <div class="alert-error">
-                    ❌ No license plates detected in the video.
-                </div>
-                """, unsafe_allow_html=True)
-            else:
-                most_common_plate, _ = Counter(plate_history).most_common(1)[0]
-                is_employee, pass_no = check_plate_in_database(most_common_plate)
-                visitor_logged = False
-                if not is_employee and not visitor_logged:
-                    visit_date = datetime.now().date()
-                    visit_time = datetime.now().time().strftime('%H:%M:%S')
-                    add_visitor_entry(most_common_plate, visit_date, visit_time)
-                    visitor_logged = True
-                st.session_state.current_plate = most_common_plate
-                st.session_state.vehicle_status = (is_employee, pass_no)
-                st.session_state.detection_time = datetime.now()
-                cap = cv2.VideoCapture(temp_video_path)
-                last_box = None
-                frames_since_seen = 0
-                max_no_detection = 15
-                visitor_logged = False
-                frame_count = 0
-                while cap.isOpened():
-                    ret, frame = cap.read()
-                    if not ret:
-                        break
-                    processed, _, box, found = process_frame(frame, model, ocr_model, plate_pattern, CONFIDENCE_THRESHOLD, smart_correct_ocr_text, try_ocr_with_retries, target_plate=most_common_plate, last_box=last_box)
-                    if box and found:
-                        last_box = box
-                        frames_since_seen = 0
+            # Copy the upload to a per-session temp file in chunks instead of one big read()
+            session_id = st.session_state.setdefault("session_id", uuid.uuid4().hex[:8])
+            suffix = os.path.splitext(uploaded_video.name)[1] or ".mp4"
+            uploaded_video.seek(0)
+            with tempfile.NamedTemporaryFile(delete=False, suffix=suffix, dir=UPLOAD_DIR) as f:
+                shutil.copyfileobj(uploaded_video, f, UPLOAD_CHUNK_SIZE)
+                temp_video_path = f.name
+            output_path = os.path.join(UPLOAD_DIR, f"output_detected_{session_id}{output_extension()}")
+            try:
+                with profiled("upload"):
+                    cap = cv2.VideoCapture(temp_video_path)
+                    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+                    fps = int(cap.get(cv2.CAP_PROP_FPS))
+                    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+                    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+                    batch_size = 40
+                    progress = ThrottledProgress(progress_bar)
+                    plate_scores = Counter()
+                    frame_reads = []
+                    registered_plates = get_registered_plates()
+                    tracker = PlateTracker()
+                    # Single detection/OCR pass; per-frame reads are cached for rendering
+                    for frames in iter_batches(iter_frames(cap), batch_size):
+                        detections_list = detect_plates(frames, model, CONFIDENCE_THRESHOLD)
+                        tracks_list = [tracker.update(detections) for detections in detections_list]
+                        # Crops from the whole batch are OCR-ed together; they share one recogniser call only in
+                        # recognition-only mode (OCR_RECOGNITION_ONLY=1), otherwise each crop runs the full pipeline.
+                        for reads in read_plates_window(frames, detections_list, ocr_model, plate_validator, smart_correct_ocr_text, try_ocr_with_retries, registered_plates=registered_plates, tracks_list=tracks_list, recognize_batch=recognize_batch):
+                            frame_reads.append(reads)
+                            for plate, _, weight in reads:
+                                plate_scores[plate] += weight
+                        progress.update(len(frame_reads) / max(total_frames, 1))
+                    cap.release()
+                    if not plate_scores:
+                        st.markdown("""
+                        <div class="alert-error">
+                            ❌ No license plates detected in the video.
+                        </div>
+                        """, unsafe_allow_html=True)
                     else:
-                        frames_since_seen += 1
-                    if last_box and frames_since_seen < max_no_detection:
-                        x1, y1, x2, y2 = last_box
-                        color = (0, 255, 0) if is_employee else (0, 0, 255)
-                        thickness = 3
-                        cv2.rectangle(processed, (x1, y1), (x2, y2), color, thickness)
-                    now = datetime.now()
-                    
-                    out.write(processed)
-                    if frame_count % 10 == 0:
-                        stframe.image(cv2.cvtColor(processed, cv2.COLOR_BGR2RGB),
-                                      caption=f"Plate Detected: {most_common_plate}", channels="RGB", use_container_width=True)
-                        # Vehicle details
+                        most_common_plate, _ = plate_scores.most_common(1)[0]
+                        is_employee, pass_no = check_plate_in_database(most_common_plate)
+                        if not is_employee:
+                            get_visitor_writer().log(most_common_plate)
+                        st.session_state.current_plate = most_common_plate
+                        st.session_state.vehicle_status = (is_employee, pass_no)
+                        st.session_state.detection_time = datetime.now()
+                        # Vehicle details don't change during the render pass, so they are drawn once
                         if st.session_state.current_plate:
                             if is_employee:
                                 details_box.markdown(f"""
@@ -270,10 +376,37 @@ if selected_option == "🎥 Live Video Processing":
                                 </p>
                             </div>
                             """, unsafe_allow_html=True)
-                    frame_count += 1
-                    progress_bar.progress(min(frame_count / total_frames, 1.0))
-                cap.release()
-                out.release()
+                        # Render pass only decodes frames and draws the cached boxes; encoding runs on a writer thread
+                        cap = cv2.VideoCapture(temp_video_path)
+                        preview = PreviewRenderer(stframe)
+                        last_box = None
+                        frames_since_seen = 0
+                        max_no_detection = 15
+                        frame_count = 0
+                        with BackgroundVideoWriter(output_path, fps, (width, height)) as out:
+                            for reads, processed in zip(frame_reads, iter_frames(cap)):
+                                box = find_plate_box(reads, most_common_plate)
+                                if box:
+                                    last_box = box
+                                    frames_since_seen = 0
+                                else:
+                                    frames_since_seen += 1
+                                if last_box and frames_since_seen < max_no_detection:
+                                    x1, y1, x2, y2 = last_box
+                                    color = (0, 255, 0) if is_employee else (0, 0, 255)
+                                    thickness = 3
+                                    cv2.rectangle(processed, (x1, y1), (x2, y2), color, thickness)
+                                with timed("render"):
+                                    out.write(processed)
+                                    preview.show(processed, caption=f"Plate Detected: {most_common_plate}")
+                                frame_count += 1
+                                progress.update(frame_count / max(total_frames, 1))
+                        progress.update(1.0, force=True)
+                        cap.release()
+                set_ocr_gauges()
+                write_metrics_file()
+            finally:
+                os.remove(temp_video_path)
 
 elif selected_option == "📝 Register New Vehicle":
     st.markdown("""
@@ -312,6 +445,35 @@ elif selected_option == "📝 Register New Vehicle":
                 </div>
                 """, unsafe_allow_html=True)
 
+    with st.expander("📥 Bulk import from CSV"):
+        st.caption("Columns: Name, Personal No, Pass No, Vehicle No. Existing vehicle numbers are updated in place.")
+        vehicles_csv = st.file_uploader("Upload a CSV file", type=["csv"], key="vehicles_csv")
+        dry_run = st.checkbox("Validate only", key="vehicles_dry_run")
+        if vehicles_csv and st.button("📥 Import Vehicles"):
+            # Like manage_vehicles.py import: retry the indexes, then refuse to upsert without the unique one.
+            ensure_indexes()
+            if not dry_run and not has_unique_vehicle_index():
+                duplicates = get_duplicate_vehicle_numbers()
+                st.markdown(f"""
+                <div class="alert-error">
+                    Import is unavailable: registered vehicles have no unique index on vehicle number
+                    {'because these plates are registered more than once: ' + ', '.join(plate for plate, _ in duplicates) if duplicates else ''}.
+                    Remove the duplicates and import again.
+                </div>
+                """, unsafe_allow_html=True)
+                st.stop()
+            lines = io.TextIOWrapper(vehicles_csv, encoding="utf-8-sig", newline="")
+            report = import_vehicles(lines, dry_run=dry_run)
+            lines.detach()
+            st.markdown(f"""
+            <div class="{'alert-error' if report['errors'] else 'alert-success'}">
+                {report['rows']} valid row(s), {len(report['errors'])} rejected{' (validated only)' if dry_run else ''}.
+                Inserted {report['inserted']}, updated {report['updated']}, unchanged {report['unchanged']}.
+            </div>
+            """, unsafe_allow_html=True)
+            if report["errors"]:
+                st.dataframe(pd.DataFrame(report["errors"], columns=["Line", "Error"]), use_container_width=True)
+
 elif selected_option == "🗑️ Remove Vehicle":
     st.markdown("""
     <div class="info-card">
@@ -342,19 +504,27 @@ elif selected_option == "📋 Registered Vehicle List":
         <h3 style="color: #00d4ff; margin-bottom: 20px;">📋 All Registered Vehicles</h3>
     </div>
     """, unsafe_allow_html=True)
-    registered_vehicles = get_all_registered_vehicles()
-    print(registered_vehicles)
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        plate_prefix = st.text_input("🔍 Vehicle Number starts with", key="vehicle_prefix").strip()
+    with col2:
+        page_size = st.selectbox("Rows per page", PAGE_SIZES, index=PAGE_SIZES.index(PAGE_SIZE), key="vehicle_page_size")
+    cursors = page_cursors("vehicles", (plate_prefix, page_size))
+    registered_vehicles, next_cursor = get_registered_vehicles_page(page_size, cursors[-1], plate_prefix or None)
 
     if registered_vehicles:
         df = pd.DataFrame([list(row) for row in registered_vehicles], columns=["Name", "Personal No", "Pass No", "Vehicle No"])
         st.dataframe(df, use_container_width=True)
+        pager("vehicles", next_cursor)
+        stats = count_registered_vehicles(plate_prefix or None)
         col1, col2, col3 = st.columns(3)
         with col1:
-            st.metric("Total Vehicles", len(registered_vehicles))
+            st.metric("Total Vehicles", stats["total"])
         with col2:
-            st.metric("Active Passes", len(registered_vehicles))
+            st.metric("Active Passes", stats["passes"])
         with col3:
             st.metric("System Status", "Online", delta="Active")
+        csv_export_button("registeredvehicles", "Registered Vehicles")
     else:
         st.markdown("""
         <div class="info-card">
@@ -371,12 +541,32 @@ elif selected_option == "👥 Visitor":
     </div>
     """, unsafe_allow_html=True)
 
-    visitor_logs = get_all_visitor_logs()
+    col1, col2, col3, col4 = st.columns([1, 1, 2, 1])
+    with col1:
+        date_from = st.date_input("From", value=None, key="visitor_from")
+    with col2:
+        date_to = st.date_input("To", value=None, key="visitor_to")
+    with col3:
+        plate_prefix = st.text_input("🔍 Plate starts with", key="visitor_prefix").strip()
+    with col4:
+        page_size = st.selectbox("Rows per page", PAGE_SIZES, index=PAGE_SIZES.index(PAGE_SIZE), key="visitor_page_size")
+    filters = {"date_from": date_from, "date_to": date_to, "plate_prefix": plate_prefix or None}
+    cursors = page_cursors("visitors", (date_from, date_to, plate_prefix, page_size))
+    visitor_logs, next_cursor = get_visitor_logs_page(page_size, cursors[-1], **filters)
     if visitor_logs:
-        import pandas as pd
+        # Rows arrive newest first from the (visitdate, visittime) index; no client-side sort.
         df = pd.DataFrame(visitor_logs, columns=["Timestamp", "Detected Plate"])
-        df = df.sort_values(by="Timestamp", ascending=False).reset_index(drop=True)
         st.dataframe(df, use_container_width=True)
+        pager("visitors", next_cursor)
+        stats = get_visitor_log_stats(**filters)
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Total Visits", stats["total"])
+        with col2:
+            st.metric("Unique Vehicles", stats["unique_vehicles"])
+        with col3:
+            st.metric("Visits Today", stats["today"])
+        csv_export_button("visitor", "Visitor Log")
     else:
         st.markdown("""
         <div class="info-card">
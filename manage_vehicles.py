@@ -0,0 +1,64 @@
+#manage_vehicles.py
+# Bulk registration from the command line:
+#   python manage_vehicles.py import passes.csv [--dry-run] [--errors rejected.csv]
+#   python manage_vehicles.py export registeredvehicles vehicles.csv
+#   python manage_vehicles.py export visitor -            (CSV to stdout)
+# Import files need name, personalno, passno and vehicleno columns (UI labels such as "Vehicle No" also work).
+import argparse
+import csv
+import sys
+
+from utils.database_utils import ensure_indexes, get_duplicate_vehicle_numbers, has_unique_vehicle_index
+from utils.vehicle_io import EXPORT_QUERIES, export_table, import_vehicles
+
+
+def run_import(args):
+    ensure_indexes()
+    if not has_unique_vehicle_index():
+        # ON CONFLICT (vehicleno) needs the unique index; without it the upsert fails halfway through.
+        duplicates = get_duplicate_vehicle_numbers()
+        print("registeredvehicles has no unique index on vehicleno"
+              + (f"; remove the duplicate plates first: {', '.join(plate for plate, _ in duplicates)}" if duplicates else ""),
+              file=sys.stderr)
+        if not args.dry_run:
+            return 2
+    with open(args.path, newline="", encoding="utf-8-sig") as f:
+        report = import_vehicles(f, dry_run=args.dry_run)
+    for line, message in report["errors"]:
+        print(f"{args.path}:{line}: {message}", file=sys.stderr)
+    if args.errors and report["errors"]:
+        with open(args.errors, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["line", "error"])
+            writer.writerows(report["errors"])
+    print(f"{report['rows']} valid row(s), {len(report['errors'])} rejected; "
+          f"inserted {report['inserted']}, updated {report['updated']}, unchanged {report['unchanged']}"
+          + (" (dry run)" if args.dry_run else ""))
+    return 1 if report["errors"] else 0
+
+def run_export(args):
+    if args.path == "-":
+        export_table(args.table, sys.stdout)
+    else:
+        with open(args.path, "w", newline="") as f:
+            export_table(args.table, f)
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import/export of registered vehicles and visitor logs.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    importer = commands.add_parser("import", help="upsert registered vehicles from a CSV file")
+    importer.add_argument("path")
+    importer.add_argument("--dry-run", action="store_true", help="validate only, write nothing")
+    importer.add_argument("--errors", help="also write rejected rows (line, error) to this CSV")
+    importer.set_defaults(run=run_import)
+    exporter = commands.add_parser("export", help="stream a table to CSV")
+    exporter.add_argument("table", choices=sorted(EXPORT_QUERIES))
+    exporter.add_argument("path", help='output file, or "-" for stdout')
+    exporter.set_defaults(run=run_export)
+    args = parser.parse_args()
+    sys.exit(args.run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+#reprocess.py
+# Offline re-processing of archived gate footage:
+#   python reprocess.py "archive/2025-07-*/*.mp4" --output events.jsonl
+#   python reprocess.py archive/ --output events.parquet --annotate data/annotated --workers 6
+# Each video is split into frame ranges that run on a process pool; every worker loads the models once.
+# Reads of the same plate less than --merge-gap seconds apart are merged into one event.
+import argparse
+import glob
+import json
+import os
+import time
+from multiprocessing import Pool
+
+import cv2
+from config import (
+    CONFIDENCE_THRESHOLD, DB_NAME, MOTION_GATING, REPROCESS_WORKERS, REPROCESS_CHUNK_FRAMES,
+)
+from utils.detection_utils import detect_plates, iter_batches, read_plates_window
+from utils.motion_utils import MotionGate
+from utils.ocr_utils import smart_correct_ocr_text, try_ocr_with_retries, recognize_batch
+from utils.plate_formats import plate_validator
+from utils.rendering import BackgroundVideoWriter, output_extension
+from utils.tracking import PlateTracker
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv")
+
+_registered_plates = None
+
+
+def _init_worker(registered_plates):
+    global _registered_plates
+    from utils.ocr_utils import warm_up_models
+    _registered_plates = registered_plates
+    warm_up_models()
+
+def _iter_range(cap, start, end, stride):
+    cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+    for index in range(start, end):
+        # grab() skips decoding the frames that the stride drops.
+        if (index - start) % stride:
+            if not cap.grab():
+                return
+            continue
+        ret, frame = cap.read()
+        if not ret:
+            return
+        yield index, frame
+
+def _process_range(task):
+    path, start, end, stride, batch_size, motion = task
+    from utils.ocr_utils import get_model, get_ocr_model
+    model, ocr_model = get_model(), get_ocr_model()
+    tracker = PlateTracker()
+    motion_gate = MotionGate() if motion else None
+    sightings = []
+    cap = cv2.VideoCapture(path)
+    try:
+        frames = _iter_range(cap, start, end, stride)
+        if motion_gate is not None:
+            frames = ((index, frame) for index, frame in frames if motion_gate.update(frame, force=bool(tracker.tracks)))
+        for batch in iter_batches(frames, batch_size):
+            indices = [index for index, _ in batch]
+            images = [frame for _, frame in batch]
+            detections_list = detect_plates(images, model, CONFIDENCE_THRESHOLD)
+            tracks_list = [tracker.update(detections) for detections in detections_list]
+            read_plates_window(images, detections_list, ocr_model, plate_validator, smart_correct_ocr_text,
+                               try_ocr_with_retries, registered_plates=_registered_plates, tracks_list=tracks_list,
+                               recognize_batch=recognize_batch)
+            # Report each track's voted plate rather than the single-frame read.
+            for index, detections, tracks in zip(indices, detections_list, tracks_list):
+                for (x1, y1, x2, y2, conf), track in zip(detections, tracks):
+                    plate = track.plate
+                    if plate:
+                        sightings.append((index, plate, conf, (x1, y1, x2, y2)))
+    finally:
+        cap.release()
+    return path, start, sightings
+
+
+def expand_inputs(inputs):
+    paths = []
+    for pattern in inputs:
+        if os.path.isdir(pattern):
+            matches = [os.path.join(root, name) for root, _, names in os.walk(pattern) for name in names]
+        else:
+            matches = glob.glob(pattern, recursive=True)
+        paths.extend(path for path in sorted(matches) if path.lower().endswith(VIDEO_EXTENSIONS))
+    return list(dict.fromkeys(paths))
+
+def video_info(path):
+    cap = cv2.VideoCapture(path)
+    try:
+        return int(cap.get(cv2.CAP_PROP_FRAME_COUNT)), cap.get(cv2.CAP_PROP_FPS) or 25.0
+    finally:
+        cap.release()
+
+def format_offset(seconds):
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(int(minutes), 60)
+    return f"{hours:02d}:{minutes:02d}:{seconds:06.3f}"
+
+def merge_events(path, sightings, fps, merge_gap, min_reads):
+    events, open_events = [], {}
+    for index, plate, conf, _ in sorted(sightings, key=lambda sighting: sighting[0]):
+        event = open_events.get(plate)
+        if event is None or (index - event["last_frame"]) / fps > merge_gap:
+            event = open_events[plate] = {"first_frame": index, "reads": 0, "conf_sum": 0.0, "conf_max": 0.0}
+            events.append((plate, event))
+        event["last_frame"] = index
+        event["reads"] += 1
+        event["conf_sum"] += conf
+        event["conf_max"] = max(event["conf_max"], conf)
+    return [
+        {
+            "video": path,
+            "plate": plate,
+            "first_frame": event["first_frame"],
+            "last_frame": event["last_frame"],
+            "first_time": format_offset(event["first_frame"] / fps),
+            "last_time": format_offset(event["last_frame"] / fps),
+            "reads": event["reads"],
+            "confidence": round(event["conf_sum"] / event["reads"], 4),
+            "max_confidence": round(event["conf_max"], 4),
+        }
+        for plate, event in events if event["reads"] >= min_reads
+    ]
+
+def annotate_video(path, sightings, output_dir, plate_index, hold_frames):
+    boxes = {}
+    for index, plate, _, box in sightings:
+        boxes.setdefault(index, []).append((plate, box))
+    cap = cv2.VideoCapture(path)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+    size = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    output_path = os.path.join(output_dir, os.path.splitext(os.path.basename(path))[0] + "_annotated" + output_extension())
+    out = BackgroundVideoWriter(output_path, fps, size)
+    # With --stride or motion gating not every frame has boxes; keep the last ones up for a few frames.
+    last, since = [], 0
+    index = 0
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        if index in boxes:
+            last, since = boxes[index], 0
+        else:
+            since += 1
+        if since < hold_frames:
+            for plate, (x1, y1, x2, y2) in last:
+                color = (0, 255, 0) if plate in plate_index else (0, 0, 255)
+                cv2.rectangle(frame, (x1, y1), (x2, y2), color, 3)
+                cv2.putText(frame, plate, (x1, max(0, y1 - 10)), cv2.FONT_HERSHEY_SIMPLEX, 0.9, color, 2)
+        out.write(frame)
+        index += 1
+    cap.release()
+    out.close()
+    return output_path
+
+def write_events(events, output):
+    if output.endswith(".parquet"):
+        import pandas as pd
+        pd.DataFrame(events).to_parquet(output, index=False)
+        return
+    with open(output, "w") as f:
+        for event in events:
+            f.write(json.dumps(event) + "\n")
+
+def load_plate_index(use_database):
+    if not use_database:
+        return {}
+    from utils.database_utils import get_plate_index
+    return dict(get_plate_index())
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-process archived gate footage into plate events.")
+    parser.add_argument("inputs", nargs="+", help="video files, directories or glob patterns")
+    parser.add_argument("--output", default="events.jsonl", help="events file; .parquet writes Parquet, anything else JSONL")
+    parser.add_argument("--annotate", metavar="DIR", help="also write <video>_annotated.mp4 files here")
+    parser.add_argument("--workers", type=int, default=REPROCESS_WORKERS)
+    parser.add_argument("--chunk-frames", type=int, default=REPROCESS_CHUNK_FRAMES, help="frames per pool task")
+    parser.add_argument("--batch", type=int, default=16, help="frames per detector call inside a task")
+    parser.add_argument("--stride", type=int, default=1, help="process every Nth frame")
+    parser.add_argument("--merge-gap", type=float, default=5.0, help="seconds between reads that still count as one event")
+    parser.add_argument("--min-reads", type=int, default=2, help="drop events with fewer reads (single-frame misreads)")
+    parser.add_argument("--no-motion", action="store_true", help="disable motion gating of static footage")
+    parser.add_argument("--no-db", action="store_true", help="skip the registered-vehicle lookup")
+    args = parser.parse_args()
+
+    paths = expand_inputs(args.inputs)
+    if not paths:
+        parser.error("no videos found")
+    plate_index = load_plate_index(bool(DB_NAME) and not args.no_db)
+    infos = {path: video_info(path) for path in paths}
+    motion = MOTION_GATING and not args.no_motion
+    tasks = [
+        (path, start, min(start + args.chunk_frames, frame_count), args.stride, args.batch, motion)
+        for path, (frame_count, _) in infos.items()
+        for start in range(0, frame_count, args.chunk_frames)
+    ]
+    print(f"{len(paths)} video(s), {sum(count for count, _ in infos.values())} frames, {len(tasks)} task(s) on {args.workers} worker(s)")
+
+    started = time.perf_counter()
+    sightings = {path: [] for path in paths}
+    remaining = {path: sum(1 for task in tasks if task[0] == path) for path in paths}
+    events = []
+    with Pool(args.workers, initializer=_init_worker, initargs=(frozenset(plate_index),)) as pool:
+        for done, (path, start, range_sightings) in enumerate(pool.imap_unordered(_process_range, tasks), 1):
+            sightings[path].extend(range_sightings)
+            remaining[path] -= 1
+            print(f"[{done}/{len(tasks)}] {path} from frame {start}: {len(range_sightings)} sighting(s)")
+            if remaining[path]:
+                continue
+            # Tracks restart at every range boundary; merging by plate and time stitches them back together.
+            video_events = merge_events(path, sightings[path], infos[path][1], args.merge_gap, args.min_reads)
+            for event in video_events:
+                event["registered"] = event["plate"] in plate_index
+                event["pass_no"] = plate_index.get(event["plate"])
+            events.extend(video_events)
+            if args.annotate:
+                os.makedirs(args.annotate, exist_ok=True)
+                print(f"Annotated video written to {annotate_video(path, sightings[path], args.annotate, plate_index, hold_frames=max(15, args.stride * 2))}")
+            del sightings[path]
+
+    events.sort(key=lambda event: (event["video"], event["first_frame"]))
+    write_events(events, args.output)
+    elapsed = time.perf_counter() - started
+    print(f"{len(events)} event(s) written to {args.output} in {elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+# test_plate_matching.py
+import unittest
+
+from utils.plate_matching import closest_registered_plate, series_slots, substitution_cost
+
+
+class ClosestRegisteredPlateTest(unittest.TestCase):
+    def test_series_o_snaps_to_registered_d(self):
+        self.assertEqual(closest_registered_plate("MH12OE1433", frozenset({"MH12DE1433"})), "MH12DE1433")
+
+    def test_same_class_series_letters_do_not_snap(self):
+        self.assertIsNone(closest_registered_plate("JH05AM1234", frozenset({"JH05AN1234"})))
+
+    def test_letter_digit_swap_snaps(self):
+        self.assertEqual(closest_registered_plate("JH05AB12S4", frozenset({"JH05AB1254"})), "JH05AB1254")
+
+    def test_o_outside_the_series_is_not_discounted(self):
+        self.assertEqual(substitution_cost("O", "D"), 1.0)
+        self.assertLess(substitution_cost("O", "D", series_slot=True), 1.0)
+
+    def test_series_slots(self):
+        self.assertEqual(list(series_slots("JH05AB1234")), [4, 5])
+        self.assertEqual(list(series_slots("JH5A1234")), [3])
+        self.assertEqual(list(series_slots("JH051234")), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
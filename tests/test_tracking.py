@@ -0,0 +1,65 @@
+# test_tracking.py
+import unittest
+
+from utils.detection_utils import read_plates
+from utils.plate_formats import plate_validator
+from utils.tracking import PlateTracker
+
+
+class FakeImage:
+    def __init__(self, height, width):
+        self.shape = (height, width, 3)
+
+    def __getitem__(self, index):
+        rows, cols = index
+        return FakeImage(rows.stop - rows.start, cols.stop - cols.start)
+
+
+class ReplayingRecognizer:
+    # Stands in for recognize_batch with the per-track crop cache: the first crop of a
+    # track is a real OCR call, later crops of a stationary plate replay it (unless fresh).
+    def __init__(self, text, fresh=False):
+        self.text = text
+        self.fresh = fresh
+        self.calls = 0
+        self.seen = set()
+
+    def __call__(self, crops, _ocr_model, scopes=None):
+        texts = []
+        for scope in scopes:
+            from_cache = not self.fresh and scope in self.seen
+            if not from_cache:
+                self.calls += 1
+            self.seen.add(scope)
+            texts.append((self.text, 0.9, from_cache))
+        return texts
+
+
+class ReadVotingTest(unittest.TestCase):
+    def run_frames(self, recognizer, frames=10):
+        tracker = PlateTracker(min_votes=3, min_agreement=0.6)
+        frame = FakeImage(720, 1280)
+        detections = [(400, 300, 640, 360, 0.9)]
+        for _ in range(frames):
+            tracks = tracker.update(detections)
+            read_plates(frame, detections, None, plate_validator, lambda text, _registered: text, None,
+                        tracks=tracks, recognize_batch=recognizer)
+        return tracks[0]
+
+    def test_cache_hits_alone_do_not_make_a_stationary_track_confident(self):
+        recognizer = ReplayingRecognizer("JH05AB1284")
+        track = self.run_frames(recognizer)
+        self.assertEqual(recognizer.calls, 1)
+        self.assertFalse(track.is_confident())
+        self.assertEqual(track.plate, "JH05AB1284")
+
+    def test_distinct_reads_make_the_track_confident(self):
+        recognizer = ReplayingRecognizer("JH05AB1284", fresh=True)
+        track = self.run_frames(recognizer)
+        self.assertTrue(track.is_confident())
+        # Once confident the track stops asking for OCR.
+        self.assertEqual(recognizer.calls, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+# test_voting.py
+import unittest
+
+from utils.voting import PlateVoter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+class PlateVoterTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.voter = PlateVoter(window=5, half_life=1.5, arrive_score=2.5, depart_after=3, clock=self.clock)
+
+    def feed(self, plate, reads, weight=0.9, step=0.1):
+        events = []
+        for _ in range(reads):
+            self.clock.advance(step)
+            events.extend(self.voter.vote(plate, weight))
+        return events
+
+    def test_arrives_after_enough_weighted_reads(self):
+        self.assertEqual(self.feed("JH05AB1234", 2), [])
+        events = self.feed("JH05AB1234", 3)
+        self.assertEqual([(e["event"], e["plate"]) for e in events], [("arrived", "JH05AB1234")])
+        self.assertEqual(self.voter.current, "JH05AB1234")
+
+    def test_departs_after_silence_and_resets(self):
+        self.feed("JH05AB1234", 5)
+        self.clock.advance(2.9)
+        self.assertEqual(self.voter.update(), [])
+        self.clock.advance(0.2)
+        events = self.voter.update()
+        self.assertEqual([(e["event"], e["plate"]) for e in events], [("departed", "JH05AB1234")])
+        self.assertIsNone(self.voter.current)
+        self.assertEqual(self.voter.scores, {})
+
+    def test_next_vehicle_replaces_current(self):
+        self.feed("JH05AB1234", 5)
+        self.clock.advance(2)
+        events = self.feed("MH12XY9999", 10)
+        self.assertEqual([(e["event"], e["plate"]) for e in events],
+                         [("departed", "JH05AB1234"), ("arrived", "MH12XY9999")])
+
+    def test_rebase_keeps_scores(self):
+        self.feed("JH05AB1234", 10)
+        before = self.voter.score("JH05AB1234")
+        origin = self.voter.origin
+        # Long enough for the exponent to trigger a rebase; steady reads keep the score constant.
+        self.feed("JH05AB1234", 600)
+        self.assertNotEqual(self.voter.origin, origin)
+        steady = self.voter.score("JH05AB1234")
+        self.feed("JH05AB1234", 1)
+        self.assertAlmostEqual(self.voter.score("JH05AB1234"), steady, places=6)
+        self.assertGreater(steady, before)
+        self.assertEqual(self.voter.current, "JH05AB1234")
+
+
+if __name__ == "__main__":
+    unittest.main()
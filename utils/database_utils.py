@@ -1,84 +1,455 @@
 # database_utils.py
 
+import re
+import time
+import threading
+from contextlib import contextmanager
+
 import psycopg2
-from config import PASSWORD, DB_HOST, DB_NAME, DB_PORT, DB_USER
+from psycopg2.pool import ThreadedConnectionPool
+from psycopg2.extras import execute_values
+from psycopg2.extensions import connection as _PgConnection, ISOLATION_LEVEL_AUTOCOMMIT
+from config import (
+    PASSWORD, DB_HOST, DB_NAME, DB_PORT, DB_USER,
+    DB_POOL_MIN, DB_POOL_MAX, DB_HEALTH_CHECK_INTERVAL, PLATE_INDEX_TTL, PAGE_SIZE,
+    DB_CONNECT_TIMEOUT, DB_RETRY_INTERVAL,
+)
+from utils.metrics import timed
 
 DB_CONNECTION_PARAMS = {
     "dbname": DB_NAME,
     "user": DB_USER,
     "password": PASSWORD,
     "host": DB_HOST,
-    "port": DB_PORT  
+    "port": DB_PORT,
+    "connect_timeout": DB_CONNECT_TIMEOUT,
+}
+
+# Server-side prepared statements, created lazily once per pooled connection.
+PREPARED_STATEMENTS = {
+    "add_visitor": "INSERT INTO visitor (vehicleno, visitdate, visittime) VALUES ($1, $2, $3)",
+    "vehicle_exists": "SELECT 1 FROM registeredvehicles WHERE vehicleno = $1",
+    "add_vehicle": "INSERT INTO registeredvehicles (name, personalno, passno, vehicleno) VALUES ($1, $2, $3, $4)",
+    "delete_vehicle": "DELETE FROM registeredvehicles WHERE vehicleno = $1",
+    "all_vehicles": "SELECT name, personalno, passno, vehicleno FROM registeredvehicles",
+    "all_visitors": "SELECT vehicleno, visitdate, visittime FROM visitor ORDER BY visitdate DESC, visittime DESC",
+    "plate_index": "SELECT vehicleno, passno FROM registeredvehicles",
 }
 
+# add/delete notify on this channel so every process drops its plate index.
+PLATE_CHANNEL = "registeredvehicles_changed"
+
+
+class PooledConnection(_PgConnection):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared = set()
+        self.last_checked = time.monotonic()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+# ThreadedConnectionPool raises PoolError once DB_POOL_MAX connections are out; callers wait here instead.
+_pool_slots = threading.BoundedSemaphore(DB_POOL_MAX)
+
+_plate_index = None
+_registered_plates = frozenset()
+_plate_index_loaded_at = 0.0
+_plate_index_lock = threading.RLock()
+_plate_index_retry_at = 0.0
+_listen_conn = None
+_listen_retry_at = 0.0
+
+# Set by use_connection_factory (the benchmark's SQLite stand-in): bypasses the pool, PREPARE and LISTEN.
+_connection_factory = None
+_POSITIONAL_PARAM = re.compile(r"\$\d+")
+
+
 def get_connection():
     return psycopg2.connect(**DB_CONNECTION_PARAMS)
 
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadedConnectionPool(
+                    DB_POOL_MIN, DB_POOL_MAX,
+                    connection_factory=PooledConnection,
+                    **DB_CONNECTION_PARAMS
+                )
+    return _pool
+
+def use_connection_factory(factory):
+    # factory() returns a DB-API connection using %s placeholders and context-managed cursors; None restores the pool.
+    global _connection_factory
+    _connection_factory = factory
+    invalidate_plate_index()
+
+def close_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
+
+def _is_healthy(conn):
+    if conn.closed:
+        return False
+    if time.monotonic() - conn.last_checked < DB_HEALTH_CHECK_INTERVAL:
+        return True
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT 1")
+        conn.rollback()
+    except psycopg2.Error:
+        return False
+    conn.last_checked = time.monotonic()
+    return True
+
+@contextmanager
+def pooled_connection():
+    if _connection_factory is not None:
+        with _factory_connection() as conn:
+            yield conn
+        return
+    with _pool_slots:
+        with _checked_out_connection() as conn:
+            yield conn
+
+@contextmanager
+def _checked_out_connection():
+    db_pool = get_pool()
+    conn = db_pool.getconn()
+    if not _is_healthy(conn):
+        db_pool.putconn(conn, close=True)
+        conn = db_pool.getconn()
+    try:
+        yield conn
+        conn.commit()
+        conn.last_checked = time.monotonic()
+    except Exception:
+        if not conn.closed:
+            try:
+                conn.rollback()
+                with conn.cursor() as cursor:
+                    cursor.execute("DEALLOCATE ALL")
+                conn.commit()
+                conn.prepared.clear()
+            except psycopg2.Error:
+                conn.close()
+        raise
+    finally:
+        db_pool.putconn(conn, close=bool(conn.closed))
+
+@contextmanager
+def _factory_connection():
+    conn = _connection_factory()
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+def _execute(cursor, name, params=()):
+    if _connection_factory is not None:
+        cursor.execute(_POSITIONAL_PARAM.sub("%s", PREPARED_STATEMENTS[name]), params)
+        return
+    conn = cursor.connection
+    if name not in conn.prepared:
+        cursor.execute(f"PREPARE {name} AS {PREPARED_STATEMENTS[name]}")
+        conn.prepared.add(name)
+    if params:
+        placeholders = ", ".join(["%s"] * len(params))
+        cursor.execute(f"EXECUTE {name} ({placeholders})", params)
+    else:
+        cursor.execute(f"EXECUTE {name}")
+
+def _listen_for_changes():
+    # Reconnects at most once per DB_RETRY_INTERVAL; until then the TTL alone keeps the index fresh.
+    global _listen_conn, _listen_retry_at
+    if _listen_conn is not None and not _listen_conn.closed:
+        return True
+    if time.monotonic() < _listen_retry_at:
+        return False
+    try:
+        _listen_conn = get_connection()
+        _listen_conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+        with _listen_conn.cursor() as cursor:
+            cursor.execute(f"LISTEN {PLATE_CHANNEL}")
+    except psycopg2.Error as e:
+        print(f"Plate change listener unavailable, retrying in {DB_RETRY_INTERVAL:.0f}s: {e}")
+        if _listen_conn is not None:
+            _listen_conn.close()
+        _listen_conn = None
+        _listen_retry_at = time.monotonic() + DB_RETRY_INTERVAL
+        return False
+    return True
+
+def _has_pending_changes():
+    global _listen_retry_at
+    if _connection_factory is not None:
+        return False
+    if not _listen_for_changes():
+        return False
+    try:
+        _listen_conn.poll()
+    except psycopg2.Error as e:
+        print(f"Plate change listener lost: {e}")
+        _listen_conn.close()
+        _listen_retry_at = time.monotonic() + DB_RETRY_INTERVAL
+        # Notifications may have been missed; reload once (or keep the old index if that fails too).
+        return True
+    if _listen_conn.notifies:
+        _listen_conn.notifies.clear()
+        return True
+    return False
+
+def _notify_plate_change(cursor, vehicle_no):
+    cursor.execute("SELECT pg_notify(%s, %s)", (PLATE_CHANNEL, vehicle_no))
+
+def load_plate_index():
+    global _plate_index, _registered_plates, _plate_index_loaded_at
+    with _plate_index_lock:
+        with pooled_connection() as conn:
+            with conn.cursor() as cursor:
+                _execute(cursor, "plate_index")
+                rows = cursor.fetchall()
+        _plate_index = {vehicle_no: pass_no for vehicle_no, pass_no in rows}
+        _registered_plates = frozenset(_plate_index)
+        _plate_index_loaded_at = time.monotonic()
+        return _plate_index
+
+def get_plate_index():
+    global _plate_index_retry_at
+    with _plate_index_lock:
+        changed = _has_pending_changes()
+        now = time.monotonic()
+        expired = now - _plate_index_loaded_at > PLATE_INDEX_TTL
+        if (_plate_index is None or changed or expired) and now >= _plate_index_retry_at:
+            try:
+                return load_plate_index()
+            except psycopg2.Error as e:
+                # Keep answering lookups from the last good index while the database is unreachable.
+                _plate_index_retry_at = now + DB_RETRY_INTERVAL
+                print(f"Plate index reload failed, serving {'the last' if _plate_index is not None else 'an empty'} index: {e}")
+        return _plate_index if _plate_index is not None else {}
+
+def get_registered_plates():
+    with _plate_index_lock:
+        get_plate_index()
+        return _registered_plates
+
+def invalidate_plate_index():
+    # Forces a reload on the next lookup but keeps the current index as a fallback.
+    global _plate_index_loaded_at, _plate_index_retry_at
+    with _plate_index_lock:
+        _plate_index_loaded_at = float("-inf")
+        _plate_index_retry_at = 0.0
+
 def check_plate_in_database(plate_number):
-    conn = get_connection()
-    cursor = conn.cursor()
-    query = "SELECT passno FROM registeredvehicles WHERE vehicleno = %s"
-    cursor.execute(query, (plate_number,))
-    result = cursor.fetchone()
-    cursor.close()
-    conn.close()
-    if result:
-        return True, result[0]
+    with timed("db_lookup"):
+        plate_index = get_plate_index()
+        if plate_number in plate_index:
+            return True, plate_index[plate_number]
     return False, None
 
 def add_visitor_entry(vehicle_no, visit_date, visit_time):
-    conn = get_connection()
-    cursor = conn.cursor()
-    query = "INSERT INTO visitor (vehicleno, visitdate, visittime) VALUES (%s, %s, %s)"
-    cursor.execute(query, (vehicle_no, visit_date, visit_time))
-    conn.commit()
-    cursor.close()
-    conn.close()
+    with timed("visitor_insert"), pooled_connection() as conn:
+        with conn.cursor() as cursor:
+            _execute(cursor, "add_visitor", (vehicle_no, visit_date, visit_time))
+
+def add_visitor_entries(entries):
+    if not entries:
+        return
+    with timed("visitor_insert"), pooled_connection() as conn:
+        with conn.cursor() as cursor:
+            execute_values(
+                cursor,
+                "INSERT INTO visitor (vehicleno, visitdate, visittime) VALUES %s",
+                entries,
+                page_size=len(entries),
+            )
 
 def add_registered_vehicle(name, personal_no, pass_no, vehicle_no):
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT 1 FROM registeredvehicles WHERE vehicleno = %s", (vehicle_no,))
-    if cursor.fetchone():
-        cursor.close()
-        conn.close()
-        return False  
-    query = "INSERT INTO registeredvehicles (name, personalno, passno, vehicleno) VALUES (%s, %s, %s, %s)"
-    cursor.execute(query, (name, personal_no, pass_no, vehicle_no))
-    conn.commit()
-    cursor.close()
-    conn.close()
-    return True 
+    with pooled_connection() as conn:
+        with conn.cursor() as cursor:
+            _execute(cursor, "vehicle_exists", (vehicle_no,))
+            if cursor.fetchone():
+                return False
+            _execute(cursor, "add_vehicle", (name, personal_no, pass_no, vehicle_no))
+            _notify_plate_change(cursor, vehicle_no)
+    invalidate_plate_index()
+    return True
 
 
 def delete_registered_vehicle(vehicle_no):
-    conn = get_connection()
-    cursor = conn.cursor()
-    query = "DELETE FROM registeredvehicles WHERE vehicleno = %s"
-    cursor.execute(query, (vehicle_no,))
-    conn.commit()
-    cursor.close()
-    conn.close()
+    with pooled_connection() as conn:
+        with conn.cursor() as cursor:
+            _execute(cursor, "delete_vehicle", (vehicle_no,))
+            _notify_plate_change(cursor, vehicle_no)
+    invalidate_plate_index()
 
 def get_all_registered_vehicles():
-    conn = get_connection()
-    cursor = conn.cursor()
-    query = "SELECT name, personalno, passno, vehicleno FROM registeredvehicles"
-    cursor.execute(query)
-    rows = cursor.fetchall()
-    cursor.close()
-    conn.close()
+    with pooled_connection() as conn:
+        with conn.cursor() as cursor:
+            _execute(cursor, "all_vehicles")
+            rows = cursor.fetchall()
     return rows
 
 def get_all_visitor_logs():
-    conn = get_connection()
-    cursor = conn.cursor()
-    query = "SELECT vehicleno, visitdate, visittime FROM visitor ORDER BY visitdate DESC, visittime DESC"
-    cursor.execute(query)
-    rows = cursor.fetchall()
-    cursor.close()
-    conn.close()
+    with pooled_connection() as conn:
+        with conn.cursor() as cursor:
+            _execute(cursor, "all_visitors")
+            rows = cursor.fetchall()
     visitor_logs = [
         (f"{row[1]} {row[2]}", row[0]) for row in rows
     ]
     return visitor_logs
+
+# Unique so bulk imports can upsert with ON CONFLICT (vehicleno).
+UNIQUE_VEHICLE_INDEX = "registeredvehicles_vehicleno_key"
+
+INDEX_STATEMENTS = [
+    ("visitor_visit_order_idx", "CREATE INDEX IF NOT EXISTS visitor_visit_order_idx ON visitor (visitdate, visittime, vehicleno)"),
+    (UNIQUE_VEHICLE_INDEX, f"CREATE UNIQUE INDEX IF NOT EXISTS {UNIQUE_VEHICLE_INDEX} ON registeredvehicles (vehicleno)"),
+    ("registeredvehicles_vehicleno_pattern_idx", "CREATE INDEX IF NOT EXISTS registeredvehicles_vehicleno_pattern_idx ON registeredvehicles (vehicleno text_pattern_ops)"),
+    ("visitor_vehicleno_pattern_idx", "CREATE INDEX IF NOT EXISTS visitor_vehicleno_pattern_idx ON visitor (vehicleno text_pattern_ops)"),
+]
+
+def ensure_indexes():
+    # One transaction per index, so duplicate plates blocking the unique index don't cost the others.
+    created = True
+    for name, statement in INDEX_STATEMENTS:
+        try:
+            with pooled_connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute(statement)
+        except psycopg2.OperationalError as e:
+            print(f"Could not create indexes: {e}")
+            return False
+        except psycopg2.Error as e:
+            print(f"Could not create index {name}: {e}")
+            created = False
+            if name == UNIQUE_VEHICLE_INDEX:
+                try:
+                    for vehicle_no, count in get_duplicate_vehicle_numbers():
+                        print(f"  duplicate vehicleno {vehicle_no!r}: {count} rows")
+                except psycopg2.Error:
+                    pass
+    try:
+        if has_unique_vehicle_index():
+            # The unique index serves equality lookups, so the old plain index is redundant once it exists.
+            with pooled_connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute("DROP INDEX IF EXISTS registeredvehicles_vehicleno_idx")
+    except psycopg2.Error as e:
+        print(f"Could not drop registeredvehicles_vehicleno_idx: {e}")
+        created = False
+    return created
+
+def has_unique_vehicle_index():
+    # Any valid, non-partial unique index on vehicleno alone lets ON CONFLICT (vehicleno) work.
+    with pooled_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM pg_index i "
+                "JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = i.indkey[0] "
+                "WHERE i.indrelid = 'registeredvehicles'::regclass AND i.indisunique AND i.indisvalid "
+                "AND i.indnatts = 1 AND i.indpred IS NULL AND i.indexprs IS NULL AND a.attname = 'vehicleno'"
+            )
+            return cursor.fetchone() is not None
+
+def get_duplicate_vehicle_numbers(limit=20):
+    with pooled_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                "SELECT vehicleno, count(*) FROM registeredvehicles GROUP BY vehicleno "
+                "HAVING count(*) > 1 ORDER BY count(*) DESC, vehicleno LIMIT %s",
+                (limit,),
+            )
+            return cursor.fetchall()
+
+def _prefix_pattern(plate_prefix):
+    # LIKE 'X%' is served by the text_pattern_ops indexes whatever the database collation is.
+    prefix = plate_prefix.upper().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return prefix + "%"
+
+def _visitor_filters(date_from=None, date_to=None, plate_prefix=None):
+    conditions, params = [], []
+    if date_from:
+        conditions.append("visitdate >= %s")
+        params.append(date_from)
+    if date_to:
+        conditions.append("visitdate <= %s")
+        params.append(date_to)
+    if plate_prefix:
+        conditions.append("vehicleno LIKE %s")
+        params.append(_prefix_pattern(plate_prefix))
+    return conditions, params
+
+def get_visitor_logs_page(limit=PAGE_SIZE, after=None, date_from=None, date_to=None, plate_prefix=None):
+    conditions, params = _visitor_filters(date_from, date_to, plate_prefix)
+    if after:
+        conditions.append("(visitdate, visittime, vehicleno) < (%s, %s, %s)")
+        params.extend(after)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    query = (
+        "SELECT visitdate::text || ' ' || visittime::text, vehicleno, visitdate, visittime FROM visitor "
+        f"{where} ORDER BY visitdate DESC, visittime DESC, vehicleno DESC LIMIT %s"
+    )
+    with pooled_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(query, params + [limit + 1])
+            rows = cursor.fetchall()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = (rows[-1][2], rows[-1][3], rows[-1][1])
+    return [(timestamp, vehicle_no) for timestamp, vehicle_no, _, _ in rows], next_cursor
+
+def get_visitor_log_stats(date_from=None, date_to=None, plate_prefix=None):
+    conditions, params = _visitor_filters(date_from, date_to, plate_prefix)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    query = (
+        "SELECT count(*), count(DISTINCT vehicleno), count(*) FILTER (WHERE visitdate = CURRENT_DATE) "
+        f"FROM visitor {where}"
+    )
+    with pooled_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(query, params)
+            total, unique_vehicles, today = cursor.fetchone()
+    return {"total": total, "unique_vehicles": unique_vehicles, "today": today}
+
+def get_registered_vehicles_page(limit=PAGE_SIZE, after=None, plate_prefix=None):
+    conditions, params = [], []
+    if plate_prefix:
+        conditions.append("vehicleno LIKE %s")
+        params.append(_prefix_pattern(plate_prefix))
+    if after:
+        conditions.append("vehicleno > %s")
+        params.append(after)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    query = f"SELECT name, personalno, passno, vehicleno FROM registeredvehicles {where} ORDER BY vehicleno LIMIT %s"
+    with pooled_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(query, params + [limit + 1])
+            rows = cursor.fetchall()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = rows[-1][3]
+    return rows, next_cursor
+
+def count_registered_vehicles(plate_prefix=None):
+    query = "SELECT count(*), count(DISTINCT passno) FROM registeredvehicles"
+    params = []
+    if plate_prefix:
+        query += " WHERE vehicleno LIKE %s"
+        params.append(_prefix_pattern(plate_prefix))
+    with pooled_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(query, params)
+            total, passes = cursor.fetchone()
+    return {"total": total, "passes": passes}
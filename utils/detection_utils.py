@@ -1,6 +1,7 @@
 # detection_utils.py
-import re
 from config import CONFIDENCE_THRESHOLD
+from utils.plate_formats import FORMAT_WEIGHTS
+from utils.metrics import timed
 
 def expand_box(box, image_shape, margin=0.05, min_margin=5):
     x1, y1, x2, y2 = box
@@ -13,32 +14,114 @@ def expand_box(box, image_shape, margin=0.05, min_margin=5):
     y2 = min(h, y2 + dy)
     return x1, y1, x2, y2
 
-def process_frame(frame, model, ocr_model, plate_pattern, CONFIDENCE_THRESHOLD, smart_correct_ocr_text, try_ocr_with_retries, target_plate=None, last_box=None):
-    results = model(frame)
-    found = False
-    current_box = last_box
-    frame_plates = []
-    boxes = results[0].boxes
-    if hasattr(boxes, 'conf'):
-        for i, box in enumerate(boxes.xyxy):
-            conf = float(boxes.conf[i])
-            if conf < CONFIDENCE_THRESHOLD:
+def iter_frames(cap):
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            return
+        yield frame
+
+def iter_batches(frames, batch_size):
+    batch = []
+    for frame in frames:
+        batch.append(frame)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def detect_plates(frames, model, CONFIDENCE_THRESHOLD, roi=None, imgsz=None):
+    if not frames:
+        return []
+    ox, oy = 0, 0
+    if roi is not None:
+        ox, oy, rx2, ry2 = roi
+        frames = [frame[oy:ry2, ox:rx2] for frame in frames]
+    with timed("yolo"):
+        results = model(list(frames), imgsz=imgsz) if imgsz else model(list(frames))
+    detections = []
+    for result in results:
+        boxes = result.boxes
+        frame_boxes = []
+        if hasattr(boxes, 'conf'):
+            for i, box in enumerate(boxes.xyxy):
+                conf = float(boxes.conf[i])
+                if conf < CONFIDENCE_THRESHOLD:
+                    continue
+                x1, y1, x2, y2 = map(int, box)
+                frame_boxes.append((x1 + ox, y1 + oy, x2 + ox, y2 + oy, conf))
+        detections.append(frame_boxes)
+    return detections
+
+def ocr_result_text(ocr_result):
+    if not ocr_result:
+        return None
+    lines = ocr_result[0]
+    text = ''.join([line[1][0] for line in lines])
+    score = sum(line[1][1] for line in lines) / len(lines)
+    return text, score
+
+def read_plates_window(frames, detections_list, ocr_model, plate_validator, smart_correct_ocr_text, try_ocr_with_retries, registered_plates=None, tracks_list=None, recognize_batch=None):
+    reads_list = [[] for _ in frames]
+    pending = []
+    for f, (frame, detections) in enumerate(zip(frames, detections_list)):
+        tracks = tracks_list[f] if tracks_list else None
+        for i, (x1, y1, x2, y2, conf) in enumerate(detections):
+            box = expand_box((x1, y1, x2, y2), frame.shape, margin=0.05)
+            track = tracks[i] if tracks else None
+            if track is not None and track.is_confident():
+                reads_list[f].append((track.plate, box, conf))
                 continue
-            x1, y1, x2, y2 = map(int, box)
-            x1, y1, x2, y2 = expand_box((x1, y1, x2, y2), frame.shape, margin=0.05)
-            cropped = frame[y1:y2, x1:x2]
+            cropped = frame[box[1]:box[3], box[0]:box[2]]
             if cropped.shape[0] < 20 or cropped.shape[1] < 60:
                 continue
-            ocr_result = try_ocr_with_retries(cropped, ocr_model)
-            if not ocr_result:
-                continue
-            text = ''.join([line[1][0] for line in ocr_result[0]]).upper()
-            cleaned = re.sub(r'[^A-Z0-9]', '', text)
-            corrected = smart_correct_ocr_text(cleaned)
-            if re.match(plate_pattern, corrected):
-                frame_plates.append(corrected)
-                if corrected == target_plate:
-                    current_box = (x1, y1, x2, y2)
-                    found = True
-                    break
+            pending.append((f, len(reads_list[f]), box, conf, track, cropped))
+            reads_list[f].append(None)
+    crops = [crop for *_, crop in pending]
+    # OCR results are only reused within the same track.
+    scopes = [track.track_id if track is not None else None for *_, track, _ in pending]
+    if recognize_batch is not None:
+        texts = recognize_batch(crops, ocr_model, scopes=scopes)
+    else:
+        # Without a scope nothing is cached, so every read here is a fresh OCR call.
+        texts = [ocr_result_text(try_ocr_with_retries(crop, ocr_model)) for crop in crops]
+    for (f, slot, box, conf, track, _), recognized in zip(pending, texts):
+        if not recognized:
+            continue
+        with timed("correction"):
+            corrected = smart_correct_ocr_text(recognized[0], registered_plates)
+        validated = plate_validator.validate(corrected)
+        if validated:
+            plate, plate_format = validated
+            # A cache hit replays an earlier read of this track, so it must not count as another vote.
+            from_cache = len(recognized) > 2 and recognized[2]
+            if track is not None and not from_cache:
+                track.add_vote(plate, FORMAT_WEIGHTS[plate_format])
+            # Each read is (plate, box, weight); the weight feeds the temporal vote downstream.
+            reads_list[f][slot] = (plate, box, conf * recognized[1] * FORMAT_WEIGHTS[plate_format])
+    return [[read for read in reads if read is not None] for reads in reads_list]
+
+def read_plates(frame, detections, ocr_model, plate_validator, smart_correct_ocr_text, try_ocr_with_retries, registered_plates=None, target_plate=None, tracks=None, recognize_batch=None):
+    reads = read_plates_window([frame], [detections], ocr_model, plate_validator, smart_correct_ocr_text, try_ocr_with_retries, registered_plates=registered_plates, tracks_list=[tracks] if tracks else None, recognize_batch=recognize_batch)[0]
+    for i, (plate, *_) in enumerate(reads):
+        if plate == target_plate:
+            return reads[:i + 1]
+    return reads
+
+def find_plate_box(reads, target_plate):
+    for plate, box, _ in reads:
+        if plate == target_plate:
+            return box
+    return None
+
+def process_frame(frame, model, ocr_model, plate_validator, CONFIDENCE_THRESHOLD, smart_correct_ocr_text, try_ocr_with_retries, target_plate=None, last_box=None, registered_plates=None, detections=None, tracker=None, recognize_batch=None):
+    if detections is None:
+        detections = detect_plates([frame], model, CONFIDENCE_THRESHOLD)[0]
+    tracks = tracker.update(detections) if tracker is not None else None
+    reads = read_plates(frame, detections, ocr_model, plate_validator, smart_correct_ocr_text, try_ocr_with_retries, registered_plates=registered_plates, target_plate=target_plate, tracks=tracks, recognize_batch=recognize_batch)
+    frame_plates = [plate for plate, *_ in reads]
+    box = find_plate_box(reads, target_plate) if target_plate else None
+    found = box is not None
+    current_box = box if found else last_box
     return frame, frame_plates, current_box, found
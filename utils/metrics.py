@@ -0,0 +1,149 @@
+# metrics.py
+import cProfile
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from config import METRICS_PORT, METRICS_FILE, PROFILE, PROFILE_DIR
+
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        with self._lock:
+            self.total += seconds
+            self.count += 1
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    self.counts[i] += 1
+                    break
+
+    def snapshot(self):
+        with self._lock:
+            cumulative, running = [], 0
+            for bound, count in zip(self.buckets, self.counts):
+                running += count
+                cumulative.append((bound, running))
+            return cumulative, self.total, self.count
+
+
+_histograms = {}
+_gauges = {}
+_registry_lock = threading.Lock()
+_server = None
+
+
+def observe(stage, seconds):
+    with _registry_lock:
+        histogram = _histograms.get(stage)
+        if histogram is None:
+            histogram = _histograms[stage] = Histogram()
+    histogram.observe(seconds)
+
+@contextmanager
+def timed(stage):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(stage, time.perf_counter() - start)
+
+def set_gauge(name, value, **labels):
+    with _registry_lock:
+        _gauges[(name, tuple(sorted(labels.items())))] = value
+
+def render_prometheus():
+    lines = [
+        "# HELP ivrs_stage_seconds Time spent in each recognition stage.",
+        "# TYPE ivrs_stage_seconds histogram",
+    ]
+    with _registry_lock:
+        histograms = sorted(_histograms.items())
+        gauges = sorted(_gauges.items())
+    for stage, histogram in histograms:
+        cumulative, total, count = histogram.snapshot()
+        for bound, running in cumulative:
+            lines.append(f'ivrs_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {running}')
+        lines.append(f'ivrs_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {count}')
+        lines.append(f'ivrs_stage_seconds_sum{{stage="{stage}"}} {total:.6f}')
+        lines.append(f'ivrs_stage_seconds_count{{stage="{stage}"}} {count}')
+    for (name, labels), value in gauges:
+        label_text = ",".join(f'{key}="{val}"' for key, val in labels)
+        lines.append(f"ivrs_{name}{{{label_text}}} {value}" if label_text else f"ivrs_{name} {value}")
+    return "\n".join(lines) + "\n"
+
+_metrics_file_lock = threading.Lock()
+
+def write_metrics_file(path=METRICS_FILE):
+    if not path:
+        return
+    # Lanes and sessions write concurrently (other processes too), so each write gets its own temp file.
+    with _metrics_file_lock:
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=os.path.basename(path) + ".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(render_prometheus())
+            # mkstemp creates the file 0600; the textfile scraper usually runs as another user.
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") != "/metrics":
+            self.send_error(404)
+            return
+        body = render_prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port=METRICS_PORT):
+    global _server
+    if not port:
+        return None
+    with _registry_lock:
+        if _server is None:
+            _server = ThreadingHTTPServer(("0.0.0.0", port), _MetricsHandler)
+            threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
+    return _server
+
+@contextmanager
+def profiled(name, enabled=PROFILE):
+    # IVRS_PROFILE=1 dumps a cProfile .prof per run; for sampling, run under py-spy instead
+    # (every pipeline thread is named, so its flame graphs split cleanly by stage).
+    if not enabled:
+        yield
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        path = os.path.join(PROFILE_DIR, f"{name}-{datetime.now():%Y%m%d-%H%M%S}.prof")
+        profiler.dump_stats(path)
+        print(f"Profile written to {path}")
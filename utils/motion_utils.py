@@ -0,0 +1,53 @@
+# motion_utils.py
+import cv2
+import numpy as np
+from config import MOTION_ROI, MOTION_SCALE, MOTION_PIXEL_THRESHOLD, MOTION_MIN_CHANGED, MOTION_HOLD_FRAMES
+
+
+def roi_box(frame_shape, roi=MOTION_ROI):
+    h, w = frame_shape[:2]
+    x1, y1, x2, y2 = roi
+    return int(x1 * w), int(y1 * h), int(x2 * w), int(y2 * h)
+
+
+class MotionGate:
+    def __init__(self, roi=MOTION_ROI, scale=MOTION_SCALE, pixel_threshold=MOTION_PIXEL_THRESHOLD,
+                 min_changed=MOTION_MIN_CHANGED, hold_frames=MOTION_HOLD_FRAMES):
+        self.roi = roi
+        self.scale = scale
+        self.pixel_threshold = pixel_threshold
+        self.min_changed = min_changed
+        self.hold_frames = hold_frames
+        self.previous = None
+        self.hold = 0
+        self.skipped = 0
+        self.changed = 0.0
+
+    def roi_box(self, frame_shape):
+        return roi_box(frame_shape, self.roi)
+
+    def _signature(self, frame):
+        x1, y1, x2, y2 = self.roi_box(frame.shape)
+        small = cv2.resize(frame[y1:y2, x1:x2], None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(gray, (5, 5), 0)
+
+    def update(self, frame, force=False):
+        current = self._signature(frame)
+        if self.previous is None or self.previous.shape != current.shape:
+            moving = True
+        else:
+            diff = cv2.absdiff(current, self.previous)
+            self.changed = np.count_nonzero(diff > self.pixel_threshold) / diff.size
+            moving = self.changed >= self.min_changed
+        self.previous = current
+        # Keep detecting for a few frames after motion stops, and for as long as
+        # the caller still has a vehicle in view (e.g. stopped at the barrier).
+        if moving or force:
+            self.hold = self.hold_frames
+        elif self.hold > 0:
+            self.hold -= 1
+        else:
+            self.skipped += 1
+            return False
+        return True
@@ -0,0 +1,107 @@
+# ocr_cache.py
+import threading
+import time
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+from config import OCR_CACHE_SIZE, OCR_CACHE_MAX_DISTANCE, OCR_CACHE_HASH_SIZE, OCR_CACHE_TTL
+
+
+def dhash(image, size=OCR_CACHE_HASH_SIZE):
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    small = cv2.resize(gray, (size + 1, size), interpolation=cv2.INTER_AREA)
+    bits = small[:, 1:] > small[:, :-1]
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+class CropCache:
+    # LRU of OCR results for one tracked plate at a time: entries are scoped by track ID,
+    # so two look-alike plates never share a read, and expire ttl seconds after they were
+    # stored (hits do not extend that). Within a track, a lookup also accepts a stored read
+    # whose dHash is within max_distance bits; an unreadable (None) result only answers an
+    # exact match, so one blurry crop can't suppress OCR of the sharper crops that follow.
+    def __init__(self, capacity=OCR_CACHE_SIZE, max_distance=OCR_CACHE_MAX_DISTANCE, hash_size=OCR_CACHE_HASH_SIZE,
+                 ttl=OCR_CACHE_TTL, max_aspect_change=0.15, clock=time.monotonic):
+        self.capacity = capacity
+        self.max_distance = max_distance
+        self.hash_size = hash_size
+        self.ttl = ttl
+        self.max_aspect_change = max_aspect_change
+        self.clock = clock
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def key(self, image, scope):
+        # Without a scope (no track) there is nothing safe to share a read with.
+        if scope is None or not self.capacity:
+            return None
+        h, w = image.shape[:2]
+        return scope, dhash(image, self.hash_size), w / float(h)
+
+    def _expire(self, now):
+        expired = [entry_key for entry_key, (stored, _, _) in self.entries.items() if now - stored > self.ttl]
+        for entry_key in expired:
+            del self.entries[entry_key]
+            self.evictions += 1
+
+    def _find(self, key):
+        scope, digest, aspect = key
+        best, best_distance = None, self.max_distance + 1
+        for (other_scope, other), (_, other_aspect, result) in self.entries.items():
+            if other_scope != scope or abs(other_aspect - aspect) > self.max_aspect_change * aspect:
+                continue
+            distance = (digest ^ other).bit_count()
+            if distance and result is None:
+                continue
+            if distance < best_distance:
+                best, best_distance = (other_scope, other), distance
+        return best, best_distance
+
+    def get(self, key):
+        # Returns (found, result); an exact repeat of an unreadable crop is still a hit.
+        if key is None:
+            return False, None
+        with self._lock:
+            self._expire(self.clock())
+            match, distance = self._find(key)
+            if match is None:
+                self.misses += 1
+                return False, None
+            self.entries.move_to_end(match)
+            if distance:
+                self.near_hits += 1
+            else:
+                self.hits += 1
+            return True, self.entries[match][2]
+
+    def put(self, key, result):
+        if key is None:
+            return
+        scope, digest, aspect = key
+        with self._lock:
+            self.entries[(scope, digest)] = (self.clock(), aspect, result)
+            self.entries.move_to_end((scope, digest))
+            while len(self.entries) > self.capacity:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.near_hits + self.misses
+            return {
+                "size": len(self.entries),
+                "hits": self.hits,
+                "near_hits": self.near_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits + self.near_hits) / lookups if lookups else 0.0,
+            }
@@ -1,75 +1,128 @@
 #ocr_utils.py
 import re
+import time
+import threading
 import cv2
-from config import MODEL_PATH
-from ultralytics import YOLO
-from paddleocr import PaddleOCR
-
-model = YOLO(MODEL_PATH)
-ocr_model = PaddleOCR(use_angle_cls=True, lang='en', use_gpu=False)
-def smart_correct_ocr_text(text, registered_plates=None):
-    text = re.sub(r'[^A-Z0-9]', '', text.upper())
-    if len(text) < 9 or len(text) > 10:
-        return text
+import numpy as np
+from config import MODEL_PATH, DETECTOR_BACKEND, OCR_VARIANTS, OCR_RECOGNITION_ONLY, OCR_REC_MIN_SCORE
+from utils.detection_utils import ocr_result_text
+from utils.plate_matching import closest_registered_plate
+from utils.plate_formats import plate_format, STATE_CODES
+from utils.metrics import timed, set_gauge
+from utils.ocr_cache import CropCache
 
-    if text.startswith("HO"):
-        text = "JH" + text[3:]
-    elif text.startswith("H0"):
-        text = "JH" + text[3:]
-    elif text.startswith("H"):
-        text = "JH" + text[2:]
-    elif text[0] == "J" and text[1] in "ABCDEFGHIJKLMNOPQRSTUVWXYZ":
-        possible_states = ["OD", "OR", "ON", "OP", "OA", "OB", "OC", "OJ"] 
-        candidate = "O" + text[1:]
-        if candidate[:2] in possible_states:
-            text = candidate
-
-    corrected = []
-    for i, c in enumerate(text):
-        if i < 2:
-            corrected.append(c)
-        elif i < 4:
-            if c in ['O', 'Q']:
-                corrected.append('0')
-            elif c in ['I', 'L', '|']:
-                corrected.append('1')
-            elif c in ['S']:
-                corrected.append('5')
-            elif c in ['G']:
-                corrected.append('6')
-            else:
-                corrected.append(c)
-        elif i < 6:
-            corrected.append(c)
-        else:
-            if c in ['O', 'Q']:
-                corrected.append('0')
-            elif c in ['I', 'L', '|']:
-                corrected.append('1')
-            elif c in ['S']:
-                corrected.append('5')
-            elif c in ['G']:
-                corrected.append('6')
-            else:
-                corrected.append(c)
-    candidate = ''.join(corrected)
+# YOLO and PaddleOCR are imported and built on first use, so pages that never
+# touch the camera (and anything importing the text helpers) stay cheap.
+_models = {}
+_models_lock = threading.RLock()
+model_load_times = {}
+
+class LockedOCR:
+    # A PaddleOCR predictor is not thread-safe, and cached instances are shared by every
+    # Streamlit session (and the upload page), so calls on one instance take turns.
+    def __init__(self, model):
+        self.model = model
+        self._lock = threading.Lock()
+
+    def ocr(self, *args, **kwargs):
+        with self._lock:
+            return self.model.ocr(*args, **kwargs)
+
+def create_ocr_model():
+    from paddleocr import PaddleOCR
+    return LockedOCR(PaddleOCR(use_angle_cls=True, lang='en', use_gpu=False))
+
+def _load(name, factory):
+    with _models_lock:
+        if name not in _models:
+            start = time.perf_counter()
+            _models[name] = factory()
+            model_load_times[name] = time.perf_counter() - start
+        return _models[name]
+
+class LockedDetector:
+    # ultralytics reuses one predictor per model and rewrites its args (imgsz, source) on each
+    # call, so the shared YOLO model takes one call at a time across sessions and threads.
+    def __init__(self, model):
+        self.model = model
+        self._lock = threading.Lock()
 
+    def __call__(self, *args, **kwargs):
+        with self._lock:
+            return self.model(*args, **kwargs)
+
+def create_detector(backend=DETECTOR_BACKEND):
+    if backend == "onnx":
+        from utils.onnx_detector import OnnxDetector
+        # Stateless per call, and onnxruntime sessions are safe to run concurrently.
+        return OnnxDetector()
+    from ultralytics import YOLO
+    return LockedDetector(YOLO(MODEL_PATH))
+
+def get_model():
+    return _load("yolo", create_detector)
+
+def get_ocr_model():
+    return _load("ocr", create_ocr_model)
+
+def warm_up_models(frame_shape=(640, 640, 3)):
+    timings = {}
+    dummy = np.zeros(frame_shape, dtype=np.uint8)
+    start = time.perf_counter()
+    get_model()(dummy, verbose=False)
+    timings["yolo_warmup"] = time.perf_counter() - start
+    start = time.perf_counter()
+    get_ocr_model().ocr(dummy[:48, :160], cls=True)
+    timings["ocr_warmup"] = time.perf_counter() - start
+    return dict(model_load_times, **timings)
+
+def __getattr__(name):
+    # Keeps `from utils.ocr_utils import model, ocr_model` working without eager loading.
+    if name == "model":
+        return get_model()
+    if name == "ocr_model":
+        return get_ocr_model()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# Slots 2-3 (RTO code) and the last four (registration number) are digits on Indian plates;
+# slots 0-1 (state) and the series between them are letters.
+DIGIT_SLOT_TABLE = str.maketrans("OQILSG|", "0011561")
+LETTER_SLOT_TABLE = str.maketrans("015826", "OISBZG")
+# Misread state prefixes, looked up after the letter-slot fix-up: prefix -> (characters replaced, state).
+STATE_PREFIX_FIXES = {
+    "HO": (3, "JH"),
+    "H": (2, "JH"),
+}
+STATE_PREFIX_FIXES.update({"J" + letter: (1, "O") for letter in "DRNPABCJ"})
+_NON_ALNUM = re.compile(r'[^A-Z0-9]')
+
+def _match_registered(candidate, registered_plates, char_confidences):
     if registered_plates:
         if candidate in registered_plates:
             return candidate
-        series = candidate[4:6]
-        swapped = []
-        for a, b in [(series.replace('O', 'D'), series.replace('D', 'O'))]:
-            test = candidate[:4] + a + candidate[6:]
-            if test in registered_plates:
-                return test
-            test = candidate[:4] + b + candidate[6:]
-            if test in registered_plates:
-                return test
-        return candidate
+        match = closest_registered_plate(candidate, registered_plates, char_confidences)
+        return match or candidate
     else:
         return candidate
 
+def smart_correct_ocr_text(text, registered_plates=None, char_confidences=None):
+    text = _NON_ALNUM.sub('', text.upper())
+    # BH-series and temporary plates don't follow the state/RTO slot layout fixed up below.
+    if plate_format(text) in ("bh", "temporary"):
+        return _match_registered(text, registered_plates, char_confidences)
+    if len(text) < 9 or len(text) > 10:
+        return text
+
+    prefix = text[:2].translate(LETTER_SLOT_TABLE)
+    fix = STATE_PREFIX_FIXES.get(prefix) or STATE_PREFIX_FIXES.get(prefix[:1])
+    if fix and prefix not in STATE_CODES:
+        replaced, state = fix
+        text = state + text[replaced:]
+
+    candidate = (text[:2].translate(LETTER_SLOT_TABLE) + text[2:4].translate(DIGIT_SLOT_TABLE)
+                 + text[4:-4].translate(LETTER_SLOT_TABLE) + text[-4:].translate(DIGIT_SLOT_TABLE))
+    return _match_registered(candidate, registered_plates, char_confidences)
+
 def preprocess_for_ocr(image):
     gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
     blur = cv2.bilateralFilter(gray, 11, 17, 17)
@@ -78,17 +131,142 @@ def preprocess_for_ocr(image):
                                    cv2.THRESH_BINARY_INV, 31, 15)
     return cv2.cvtColor(thresh, cv2.COLOR_GRAY2BGR)
 
-def try_ocr_with_retries(image, ocr_model):
-    try:
-        variants = [
-            preprocess_for_ocr(image),
-            cv2.rotate(preprocess_for_ocr(image), cv2.ROTATE_90_CLOCKWISE),
-            cv2.rotate(preprocess_for_ocr(image), cv2.ROTATE_90_COUNTERCLOCKWISE)
-        ]
-        for variant in variants:
+_ROTATIONS = {
+    "upright": None,
+    "rotate_cw": cv2.ROTATE_90_CLOCKWISE,
+    "rotate_ccw": cv2.ROTATE_90_COUNTERCLOCKWISE,
+}
+ocr_variant_stats = {name: {"attempts": 0, "hits": 0} for name in _ROTATIONS}
+_stats_lock = threading.Lock()
+
+def variant_order(image, enabled=OCR_VARIANTS):
+    h, w = image.shape[:2]
+    # A crop taller than it is wide is most likely a plate lying on its side.
+    if h > w:
+        order = ["rotate_cw", "rotate_ccw", "upright"]
+    else:
+        order = ["upright", "rotate_cw", "rotate_ccw"]
+    return [name for name in order if name in enabled]
+
+def iter_ocr_variants(image, order=None, processed=None):
+    for name in order or variant_order(image):
+        if processed is None:
+            processed = preprocess_for_ocr(image)
+        rotation = _ROTATIONS[name]
+        yield name, processed if rotation is None else cv2.rotate(processed, rotation)
+
+def _record_variant(name, hit):
+    with _stats_lock:
+        ocr_variant_stats[name]["attempts"] += 1
+        if hit:
+            ocr_variant_stats[name]["hits"] += 1
+
+def get_ocr_variant_stats():
+    with _stats_lock:
+        return {
+            name: dict(stats, hit_rate=stats["hits"] / stats["attempts"] if stats["attempts"] else 0.0)
+            for name, stats in ocr_variant_stats.items()
+        }
+
+# Full-pipeline results and recognition-only (text, score) pairs are cached separately.
+ocr_crop_cache = CropCache()
+rec_crop_cache = CropCache()
+
+def get_ocr_cache_stats():
+    return {"ocr": ocr_crop_cache.stats(), "rec": rec_crop_cache.stats()}
+
+def set_ocr_gauges(variant_stats=None, cache_stats=None):
+    # Defaults to this process's counters; gate_server passes the totals gathered from its workers.
+    if variant_stats is None:
+        variant_stats = get_ocr_variant_stats()
+    if cache_stats is None:
+        cache_stats = get_ocr_cache_stats()
+    for cache_name, stats in cache_stats.items():
+        set_gauge("ocr_cache_hits_total", stats["hits"] + stats["near_hits"], cache=cache_name)
+        set_gauge("ocr_cache_misses_total", stats["misses"], cache=cache_name)
+    for variant, stats in variant_stats.items():
+        set_gauge("ocr_variant_attempts_total", stats["attempts"], variant=variant)
+        set_gauge("ocr_variant_hits_total", stats["hits"], variant=variant)
+        set_gauge("ocr_variant_hit_rate", stats["hit_rate"], variant=variant)
+
+def _cached_ocr(image, ocr_model, scope, cache):
+    # Returns (result, from_cache).
+    processed = preprocess_for_ocr(image)
+    key = cache.key(processed, scope)
+    found, cached = cache.get(key)
+    if found:
+        return cached, True
+    result = None
+    for name, variant in iter_ocr_variants(image, processed=processed):
+        with timed(f"ocr.{name}"):
             result = ocr_model.ocr(variant, cls=True)
-            if result and isinstance(result, list) and len(result) > 0 and len(result[0]) > 0:
-                return result
+        hit = bool(result and isinstance(result, list) and len(result) > 0 and result[0])
+        _record_variant(name, hit)
+        if hit:
+            break
+        result = None
+    cache.put(key, result)
+    return result, False
+
+def try_ocr_with_retries(image, ocr_model, scope=None, cache=ocr_crop_cache):
+    # scope is the plate's track ID; crops without one are never cached.
+    try:
+        return _cached_ocr(image, ocr_model, scope, cache)[0]
     except Exception:
         return None
-    return None
\ No newline at end of file
+
+def _with_cache_flag(recognized, from_cache):
+    return recognized + (from_cache,) if recognized else None
+
+def recognize_batch(images, ocr_model, scopes=None, recognition_only=OCR_RECOGNITION_ONLY):
+    # One (text, score, from_cache) or None per image; a replayed cache entry is not a new read.
+    scopes = scopes or [None] * len(images)
+    if not recognition_only:
+        texts = []
+        for image, scope in zip(images, scopes):
+            try:
+                result, from_cache = _cached_ocr(image, ocr_model, scope, ocr_crop_cache)
+            except Exception:
+                result, from_cache = None, False
+            texts.append(_with_cache_flag(ocr_result_text(result), from_cache))
+        return texts
+    # YOLO already localised the plate, so skip text detection and send every crop's
+    # next variant through the recogniser in one call; misses retry with their next variant.
+    texts = [None] * len(images)
+    processed = [preprocess_for_ocr(image) for image in images]
+    keys = [rec_crop_cache.key(image, scope) for image, scope in zip(processed, scopes)]
+    variants = [iter_ocr_variants(image, processed=prepared) for image, prepared in zip(images, processed)]
+    pending = []
+    from_cache = [False] * len(images)
+    for i, key in enumerate(keys):
+        found, cached = rec_crop_cache.get(key)
+        if found:
+            texts[i] = cached
+            from_cache[i] = True
+        else:
+            pending.append(i)
+    misses = list(pending)
+    while pending:
+        batch = [(i, variant) for i in pending for variant in [next(variants[i], None)] if variant is not None]
+        if not batch:
+            break
+        try:
+            # A nested list is passed to the recogniser as a single batch.
+            with timed("ocr.batch"):
+                result = ocr_model.ocr([[image for _, (_, image) in batch]], det=False, cls=True)
+            recognized = result[0] if result else []
+        except Exception:
+            # Don't cache the failure of a single call as "unreadable".
+            misses = []
+            break
+        pending = []
+        for (i, (name, _)), (text, score) in zip(batch, recognized):
+            hit = bool(text) and score >= OCR_REC_MIN_SCORE
+            _record_variant(name, hit)
+            if hit:
+                texts[i] = (text, score)
+            else:
+                pending.append(i)
+    for i in misses:
+        rec_crop_cache.put(keys[i], texts[i])
+    return [_with_cache_flag(text, cached) for text, cached in zip(texts, from_cache)]
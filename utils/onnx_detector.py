@@ -0,0 +1,100 @@
+# onnx_detector.py
+import cv2
+import numpy as np
+from config import DETECTION_IMGSZ, ONNX_MODEL_PATH, ONNX_THREADS, ONNX_PROVIDERS
+
+
+class Boxes:
+    def __init__(self, xyxy, conf, cls):
+        self.xyxy = xyxy
+        self.conf = conf
+        self.cls = cls
+
+    def __len__(self):
+        return len(self.conf)
+
+
+class Result:
+    def __init__(self, boxes, orig_shape):
+        self.boxes = boxes
+        self.orig_shape = orig_shape
+
+
+def letterbox(frame, size):
+    h, w = frame.shape[:2]
+    scale = min(size / h, size / w)
+    nh, nw = round(h * scale), round(w * scale)
+    resized = cv2.resize(frame, (nw, nh), interpolation=cv2.INTER_LINEAR) if (nh, nw) != (h, w) else frame
+    top, left = (size - nh) // 2, (size - nw) // 2
+    padded = np.full((size, size, 3), 114, dtype=np.uint8)
+    padded[top:top + nh, left:left + nw] = resized
+    return padded, scale, left, top
+
+def xywh_to_tlwh(xywh):
+    tlwh = xywh.copy()
+    tlwh[:, :2] -= xywh[:, 2:] / 2
+    return tlwh
+
+
+class OnnxDetector:
+    # Stands in for ultralytics.YOLO: model(frames, imgsz=...) returns results whose
+    # .boxes expose xyxy/conf/cls, which is all detect_plates reads.
+    def __init__(self, path=ONNX_MODEL_PATH, threads=ONNX_THREADS, providers=ONNX_PROVIDERS,
+                 imgsz=DETECTION_IMGSZ, conf=0.25, iou=0.7):
+        import onnxruntime as ort
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        available = set(ort.get_available_providers())
+        self.session = ort.InferenceSession(path, options, providers=[p for p in providers if p in available] or None)
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        size = model_input.shape[2]
+        # Exports made with dynamic=True accept any multiple of 32; fixed exports ignore imgsz.
+        self.fixed_imgsz = size if isinstance(size, int) else None
+        self.dynamic_batch = not isinstance(model_input.shape[0], int)
+        self.imgsz = self.fixed_imgsz or imgsz
+        self.conf = conf
+        self.iou = iou
+
+    def _input_size(self, imgsz):
+        if self.fixed_imgsz:
+            return self.fixed_imgsz
+        return max(32, int(round((imgsz or self.imgsz) / 32)) * 32)
+
+    def _postprocess(self, prediction, scale, left, top, orig_shape):
+        # YOLOv8 head: (4 + classes, anchors) with centre-xywh boxes and per-class scores.
+        prediction = prediction.T
+        scores = prediction[:, 4:]
+        cls = scores.argmax(1)
+        conf = scores[np.arange(len(scores)), cls]
+        keep = conf >= self.conf
+        xywh, conf, cls = prediction[keep, :4], conf[keep], cls[keep]
+        if not len(conf):
+            empty = np.zeros((0, 4), dtype=np.float32)
+            return Result(Boxes(empty, np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.float32)), orig_shape)
+        xyxy = np.empty_like(xywh)
+        xyxy[:, :2] = xywh[:, :2] - xywh[:, 2:] / 2
+        xyxy[:, 2:] = xywh[:, :2] + xywh[:, 2:] / 2
+        indices = np.asarray(cv2.dnn.NMSBoxes(xywh_to_tlwh(xywh).tolist(), conf.tolist(), self.conf, self.iou), dtype=int).reshape(-1)
+        xyxy, conf, cls = xyxy[indices], conf[indices], cls[indices]
+        xyxy[:, [0, 2]] = ((xyxy[:, [0, 2]] - left) / scale).clip(0, orig_shape[1])
+        xyxy[:, [1, 3]] = ((xyxy[:, [1, 3]] - top) / scale).clip(0, orig_shape[0])
+        return Result(Boxes(xyxy, conf, cls.astype(np.float32)), orig_shape)
+
+    def __call__(self, frames, imgsz=None, verbose=False):
+        if isinstance(frames, np.ndarray):
+            frames = [frames]
+        size = self._input_size(imgsz)
+        letterboxed = [letterbox(frame, size) for frame in frames]
+        batch = np.stack([padded[:, :, ::-1] for padded, _, _, _ in letterboxed])
+        batch = np.ascontiguousarray(batch.transpose(0, 3, 1, 2), dtype=np.float32) / 255.0
+        if self.dynamic_batch:
+            outputs = self.session.run(None, {self.input_name: batch})[0]
+        else:
+            outputs = np.concatenate([self.session.run(None, {self.input_name: batch[i:i + 1]})[0] for i in range(len(batch))])
+        return [
+            self._postprocess(prediction, scale, left, top, frame.shape[:2])
+            for prediction, frame, (_, scale, left, top) in zip(outputs, frames, letterboxed)
+        ]
@@ -0,0 +1,175 @@
+# pipeline.py
+import collections
+import threading
+import time
+
+from config import PIPELINE_QUEUE_SIZE, MOTION_GATING
+from utils.detection_utils import detect_plates, read_plates
+from utils.tracking import PlateTracker
+from utils.motion_utils import MotionGate
+from utils.scheduler import AdaptiveScheduler
+
+
+class DropOldestQueue:
+    def __init__(self, maxsize):
+        self.items = collections.deque()
+        self.maxsize = maxsize
+        self.dropped = 0
+        self._cond = threading.Condition()
+
+    def put(self, item):
+        with self._cond:
+            if self.maxsize and len(self.items) >= self.maxsize:
+                self.items.popleft()
+                self.dropped += 1
+            self.items.append(item)
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        with self._cond:
+            if not self.items:
+                self._cond.wait(timeout)
+            if not self.items:
+                return None
+            return self.items.popleft()
+
+    def get_all(self):
+        with self._cond:
+            items = list(self.items)
+            self.items.clear()
+            return items
+
+    def __len__(self):
+        with self._cond:
+            return len(self.items)
+
+
+class WebcamPipeline:
+    def __init__(self, cap, model, ocr_models, plate_validator, CONFIDENCE_THRESHOLD, smart_correct_ocr_text,
+                 try_ocr_with_retries, registered_plates_fn=None, recognize_batch=None, queue_size=PIPELINE_QUEUE_SIZE,
+                 motion_gating=MOTION_GATING):
+        self.cap = cap
+        self.model = model
+        self.ocr_models = ocr_models
+        self.plate_validator = plate_validator
+        self.confidence_threshold = CONFIDENCE_THRESHOLD
+        self.smart_correct_ocr_text = smart_correct_ocr_text
+        self.try_ocr_with_retries = try_ocr_with_retries
+        self.registered_plates_fn = registered_plates_fn
+        self.recognize_batch = recognize_batch
+        self.tracker = PlateTracker()
+        self.motion_gate = MotionGate() if motion_gating else None
+        self.scheduler = AdaptiveScheduler()
+        self.ocr_skipped = 0
+        # Capture keeps only the latest frame; later stages drop their oldest item when full.
+        self.frame_queue = DropOldestQueue(1)
+        self.ocr_queue = DropOldestQueue(queue_size)
+        self.render_queue = DropOldestQueue(queue_size)
+        self.captured = 0
+        self.busy = 0
+        self._busy_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._capture_done = threading.Event()
+        self._threads = []
+
+    def start(self):
+        targets = [("capture", self._capture), ("detect", self._detect)]
+        targets += [(f"ocr-{i}", self._ocr_worker(ocr_model)) for i, ocr_model in enumerate(self.ocr_models)]
+        for name, target in targets:
+            thread = threading.Thread(target=target, name=f"pipeline-{name}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self, timeout=2):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _set_busy(self, delta):
+        with self._busy_lock:
+            self.busy += delta
+
+    def _capture(self):
+        while not self._stop.is_set():
+            ret, frame = self.cap.read()
+            if not ret:
+                break
+            self.frame_queue.put((self.captured, frame))
+            self.captured += 1
+        self._capture_done.set()
+
+    def _detect(self):
+        while not self._stop.is_set():
+            item = self.frame_queue.get(timeout=0.1)
+            if item is None:
+                continue
+            self._set_busy(1)
+            try:
+                index, frame = item
+                roi = None
+                if self.motion_gate is not None:
+                    if not self.motion_gate.update(frame, force=bool(self.tracker.tracks)):
+                        self.render_queue.put((index, frame, []))
+                        continue
+                    roi = self.motion_gate.roi_box(frame.shape)
+                if not self.scheduler.should_detect():
+                    self.render_queue.put((index, frame, []))
+                    continue
+                start = time.perf_counter()
+                detections = detect_plates([frame], self.model, self.confidence_threshold, roi=roi,
+                                           imgsz=self.scheduler.imgsz)[0]
+                tracks = self.tracker.update(detections)
+                self.scheduler.record(time.perf_counter() - start, tracking=bool(self.tracker.tracks))
+                if not detections:
+                    self.render_queue.put((index, frame, []))
+                elif all(track.is_confident() for track in tracks):
+                    # Every plate in view is already identified, so the OCR stage is skipped.
+                    reads = read_plates(frame, detections, None, self.plate_validator, self.smart_correct_ocr_text,
+                                        self.try_ocr_with_retries, tracks=tracks)
+                    self.ocr_skipped += 1
+                    self.render_queue.put((index, frame, reads))
+                else:
+                    self.ocr_queue.put((index, frame, detections, tracks))
+            finally:
+                self._set_busy(-1)
+
+    def _ocr_worker(self, ocr_model):
+        def run():
+            while not self._stop.is_set():
+                item = self.ocr_queue.get(timeout=0.1)
+                if item is None:
+                    continue
+                self._set_busy(1)
+                try:
+                    index, frame, detections, tracks = item
+                    registered_plates = self.registered_plates_fn() if self.registered_plates_fn else None
+                    reads = read_plates(frame, detections, ocr_model, self.plate_validator, self.smart_correct_ocr_text,
+                                        self.try_ocr_with_retries, registered_plates=registered_plates, tracks=tracks,
+                                        recognize_batch=self.recognize_batch)
+                    self.render_queue.put((index, frame, reads))
+                finally:
+                    self._set_busy(-1)
+        return run
+
+    def results(self, timeout=0.5):
+        first = self.render_queue.get(timeout)
+        if first is None:
+            return []
+        return sorted([first] + self.render_queue.get_all(), key=lambda item: item[0])
+
+    def is_done(self):
+        return self._capture_done.is_set() and self.busy == 0 and not (
+            len(self.frame_queue) or len(self.ocr_queue) or len(self.render_queue))
+
+    def metrics(self):
+        return {
+            "capture": {"depth": len(self.frame_queue), "dropped": self.frame_queue.dropped},
+            "ocr": {"depth": len(self.ocr_queue), "dropped": self.ocr_queue.dropped},
+            "render": {"depth": len(self.render_queue), "dropped": self.render_queue.dropped},
+            "captured": self.captured,
+            "ocr_skipped": self.ocr_skipped,
+            "tracks": len(self.tracker.tracks),
+            "motion_skipped": self.motion_gate.skipped if self.motion_gate else 0,
+            "scheduler": self.scheduler.status(),
+        }
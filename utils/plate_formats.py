@@ -0,0 +1,51 @@
+# plate_formats.py
+import re
+from config import PLATE_FORMATS
+
+# State/UT codes, including retired ones (OR, UA, DD, DN) still seen on older vehicles.
+STATE_CODES = frozenset((
+    "AN", "AP", "AR", "AS", "BR", "CG", "CH", "DD", "DL", "DN", "GA", "GJ", "HP", "HR", "JH", "JK", "KA", "KL",
+    "LA", "LD", "MH", "ML", "MN", "MP", "MZ", "NL", "OD", "OR", "PB", "PY", "RJ", "SK", "TG", "TN", "TR", "TS",
+    "UA", "UK", "UP", "WB",
+))
+
+# Checked in this order; the first format that matches wins.
+FORMAT_PATTERNS = {
+    "standard": r"(?P<state>[A-Z]{2})(?P<rto>[0-9]{1,2})(?P<series>[A-Z]{1,3})(?P<number>[0-9]{4})",
+    "bh": r"(?P<year>[0-9]{2})BH(?P<number>[0-9]{4})(?P<series>[A-Z]{1,2})",
+    "temporary": r"T(?P<month>0[1-9]|1[0-2])(?P<year>[0-9]{2})(?P<state>[A-Z]{2})(?P<number>[0-9]{4})(?P<series>[A-Z]{1,2})",
+    "legacy": r"(?P<state>[A-Z]{2})(?P<rto>[0-9]{1,2})(?P<number>[0-9]{4})",
+}
+
+# Vote weight per format: formats that OCR noise can imitate more easily count for less.
+FORMAT_WEIGHTS = {"standard": 1.0, "bh": 1.0, "temporary": 0.8, "legacy": 0.5}
+
+_NON_ALNUM = re.compile(r'[^A-Z0-9]')
+
+
+class PlateValidator:
+    def __init__(self, formats=PLATE_FORMATS, states=STATE_CODES):
+        self.formats = [(name, re.compile(FORMAT_PATTERNS[name])) for name in FORMAT_PATTERNS if name in formats]
+        self.states = states
+
+    def match(self, plate):
+        for name, regex in self.formats:
+            found = regex.fullmatch(plate)
+            if found and ("state" not in regex.groupindex or found["state"] in self.states):
+                return name
+        return None
+
+    def validate(self, text):
+        # One call cleans the raw text and classifies it: (plate, format) or None.
+        plate = _NON_ALNUM.sub('', text.upper())
+        name = self.match(plate)
+        return (plate, name) if name else None
+
+
+plate_validator = PlateValidator()
+
+def validate_plate(text, validator=plate_validator):
+    return validator.validate(text)
+
+def plate_format(plate, validator=plate_validator):
+    return validator.match(plate)
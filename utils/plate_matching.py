@@ -0,0 +1,141 @@
+# plate_matching.py
+import re
+
+from config import PLATE_MATCH_MAX_EDITS, PLATE_MATCH_MAX_COST
+from utils.plate_formats import FORMAT_PATTERNS
+
+# Characters that OCR commonly swaps on number plates. Swapping a letter for a digit (or back)
+# is cheap, because the registered plate shows that character can't be valid in that slot.
+# Letter/letter and digit/digit pairs (M/N, O/D, ...) are both legitimate in the same slot,
+# so they only get the discount when OCR reported low confidence for that character, or when
+# the read character is one that series letters never use (I and O) and sits in a series slot.
+CONFUSABLE_PAIRS = [
+    ("O", "0"), ("O", "D"), ("D", "0"), ("Q", "0"), ("Q", "O"),
+    ("I", "1"), ("L", "1"), ("I", "L"), ("J", "1"),
+    ("S", "5"), ("B", "8"), ("G", "6"), ("Z", "2"), ("A", "4"), ("T", "7"),
+    ("U", "V"), ("M", "N"), ("H", "M"), ("K", "X"),
+]
+CONFUSION_COST = 0.4
+LOW_CHAR_CONFIDENCE = 0.6
+SERIES_EXCLUDED_CHARS = frozenset("IO")
+_SERIES_PATTERNS = [re.compile(pattern) for pattern in FORMAT_PATTERNS.values() if "(?P<series>" in pattern]
+CONFUSION_COSTS = {}
+for a, b in CONFUSABLE_PAIRS:
+    CONFUSION_COSTS[(a, b)] = CONFUSION_COST
+    CONFUSION_COSTS[(b, a)] = CONFUSION_COST
+
+
+def edit_distance(a, b):
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        previous = current
+    return previous[-1]
+
+def series_slots(plate):
+    for pattern in _SERIES_PATTERNS:
+        match = pattern.fullmatch(plate)
+        if match:
+            return range(*match.span("series"))
+    return range(0)
+
+def substitution_cost(observed_char, candidate_char, confidence=None, series_slot=False):
+    if observed_char == candidate_char:
+        return 0.0
+    if (observed_char, candidate_char) not in CONFUSION_COSTS:
+        return 1.0
+    if observed_char.isdigit() != candidate_char.isdigit():
+        return CONFUSION_COSTS[(observed_char, candidate_char)]
+    if series_slot and observed_char in SERIES_EXCLUDED_CHARS:
+        return CONFUSION_COSTS[(observed_char, candidate_char)]
+    if confidence is not None and confidence < LOW_CHAR_CONFIDENCE:
+        return CONFUSION_COSTS[(observed_char, candidate_char)]
+    return 1.0
+
+def weighted_edit_distance(observed, candidate, char_confidences=None):
+    # Changing a low-confidence character costs less than changing one OCR was sure about.
+    def confidence(i):
+        if not char_confidences or i >= len(char_confidences):
+            return None
+        return float(char_confidences[i])
+
+    def weight(i):
+        value = confidence(i)
+        return 1.0 if value is None else max(value, 0.1)
+
+    series = series_slots(candidate)
+    previous = [0.0]
+    for j in range(len(candidate)):
+        previous.append(previous[-1] + 1.0)
+    for i, ca in enumerate(observed, 1):
+        w = weight(i - 1)
+        char_confidence = confidence(i - 1)
+        current = [previous[0] + w]
+        for j, cb in enumerate(candidate, 1):
+            substitution = substitution_cost(ca, cb, char_confidence, j - 1 in series) * w
+            current.append(min(previous[j] + w, current[j - 1] + 1.0, previous[j - 1] + substitution))
+        previous = current
+    return previous[-1]
+
+
+def _deletes(word, max_edits):
+    variants = {word}
+    frontier = {word}
+    for _ in range(max_edits):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))}
+        variants |= frontier
+    return variants
+
+
+class DeleteIndex:
+    # Symmetric-delete index: two plates within max_edits edits share at least one
+    # deletion variant, so a lookup is a handful of dict probes instead of a scan.
+    def __init__(self, words=(), max_edits=PLATE_MATCH_MAX_EDITS):
+        self.max_edits = max_edits
+        self.variants = {}
+        for word in words:
+            self.add(word)
+
+    def add(self, word):
+        for variant in _deletes(word, self.max_edits):
+            self.variants.setdefault(variant, set()).add(word)
+
+    def search(self, word, max_distance=None):
+        max_distance = self.max_edits if max_distance is None else min(max_distance, self.max_edits)
+        candidates = set()
+        for variant in _deletes(word, max_distance):
+            candidates |= self.variants.get(variant, set())
+        matches = []
+        for candidate in candidates:
+            distance = edit_distance(word, candidate)
+            if distance <= max_distance:
+                matches.append((distance, candidate))
+        return matches
+
+
+_index_plates = None
+_index = None
+
+
+def get_plate_match_index(registered_plates):
+    global _index_plates, _index
+    if registered_plates is not _index_plates:
+        _index = DeleteIndex(registered_plates)
+        _index_plates = registered_plates
+    return _index
+
+def closest_registered_plate(text, registered_plates, char_confidences=None,
+                             max_edits=PLATE_MATCH_MAX_EDITS, max_cost=PLATE_MATCH_MAX_COST):
+    index = get_plate_match_index(registered_plates)
+    scored = sorted(
+        (weighted_edit_distance(text, candidate, char_confidences), candidate)
+        for _, candidate in index.search(text, max_edits)
+    )
+    if not scored or scored[0][0] > max_cost:
+        return None
+    # Two equally close registered plates are ambiguous; keep the OCR reading instead.
+    if len(scored) > 1 and scored[1][0] == scored[0][0]:
+        return None
+    return scored[0][1]
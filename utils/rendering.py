@@ -0,0 +1,119 @@
+# rendering.py
+import queue
+import threading
+import time
+
+import cv2
+from config import (
+    PREVIEW_MAX_WIDTH, PREVIEW_MAX_FPS, PREVIEW_JPEG_QUALITY, PROGRESS_INTERVAL, VIDEO_CODEC, VIDEO_WRITER_QUEUE,
+)
+from utils.metrics import timed
+
+# MJPG is intra-only and cheap to encode everywhere, but needs an .avi container;
+# avc1 (H.264) plays in browsers when the local OpenCV build ships an encoder.
+CODEC_EXTENSIONS = {"mp4v": ".mp4", "avc1": ".mp4", "MJPG": ".avi", "XVID": ".avi"}
+
+
+class RateLimiter:
+    def __init__(self, interval, clock=time.monotonic):
+        self.interval = interval
+        self.clock = clock
+        self.last = None
+
+    def ready(self, force=False):
+        now = self.clock()
+        if not force and self.last is not None and now - self.last < self.interval:
+            return False
+        self.last = now
+        return True
+
+
+class PreviewRenderer:
+    # Sends downscaled JPEG bytes to a Streamlit placeholder at most max_fps times a second.
+    # cv2 encodes straight from BGR, so there is no cvtColor copy and Streamlit doesn't re-encode.
+    def __init__(self, placeholder, max_width=PREVIEW_MAX_WIDTH, max_fps=PREVIEW_MAX_FPS, quality=PREVIEW_JPEG_QUALITY):
+        self.placeholder = placeholder
+        self.max_width = max_width
+        self.limiter = RateLimiter(1.0 / max_fps if max_fps else 0)
+        self.params = [cv2.IMWRITE_JPEG_QUALITY, quality]
+        self.shown = 0
+        self.skipped = 0
+
+    def show(self, frame, caption=None, force=False):
+        if not self.limiter.ready(force):
+            self.skipped += 1
+            return False
+        with timed("preview"):
+            h, w = frame.shape[:2]
+            if w > self.max_width:
+                frame = cv2.resize(frame, (self.max_width, int(h * self.max_width / w)), interpolation=cv2.INTER_AREA)
+            ok, encoded = cv2.imencode(".jpg", frame, self.params)
+            if ok:
+                self.placeholder.image(encoded.tobytes(), caption=caption, use_container_width=True)
+        self.shown += 1
+        return True
+
+
+class ThrottledProgress:
+    def __init__(self, progress_bar, interval=PROGRESS_INTERVAL):
+        self.progress_bar = progress_bar
+        self.limiter = RateLimiter(interval)
+
+    def update(self, fraction, force=False):
+        if self.limiter.ready(force):
+            self.progress_bar.progress(min(max(fraction, 0.0), 1.0))
+
+
+def output_extension(codec=VIDEO_CODEC):
+    return CODEC_EXTENSIONS.get(codec, ".mp4")
+
+def open_video_writer(path, fps, size, codec=VIDEO_CODEC):
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*codec), fps, size)
+    if not writer.isOpened() and codec != "mp4v":
+        print(f"Codec {codec} unavailable, falling back to mp4v")
+        writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, size)
+    return writer
+
+
+class BackgroundVideoWriter:
+    # Encodes on its own thread; the bounded queue applies back-pressure instead of dropping frames.
+    def __init__(self, path, fps, size, codec=VIDEO_CODEC, queue_size=VIDEO_WRITER_QUEUE):
+        self.path = path
+        self.writer = open_video_writer(path, fps, size, codec)
+        self.queue = queue.Queue(queue_size)
+        self.written = 0
+        self.error = None
+        self._thread = threading.Thread(target=self._run, name="video-writer", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            frame = self.queue.get()
+            if frame is None:
+                break
+            if self.error is not None:
+                continue
+            try:
+                with timed("encode"):
+                    self.writer.write(frame)
+                self.written += 1
+            except cv2.error as e:
+                self.error = e
+        self.writer.release()
+
+    def write(self, frame):
+        # The frame must not be modified after it is handed over.
+        self.queue.put(frame)
+
+    def close(self):
+        self.queue.put(None)
+        self._thread.join()
+        if self.error is not None:
+            print(f"Video writer failed for {self.path}: {self.error}")
+        return self.written
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
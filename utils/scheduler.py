@@ -0,0 +1,66 @@
+# scheduler.py
+from config import TARGET_FPS, MAX_DETECTION_STRIDE, DETECTION_IMGSZ, MIN_DETECTION_IMGSZ
+
+
+class AdaptiveScheduler:
+    def __init__(self, target_fps=TARGET_FPS, max_stride=MAX_DETECTION_STRIDE, imgsz=DETECTION_IMGSZ,
+                 min_imgsz=MIN_DETECTION_IMGSZ, smoothing=0.2, cooldown=5):
+        self.budget = 1.0 / target_fps
+        self.max_stride = max_stride
+        self.max_imgsz = imgsz
+        self.min_imgsz = min_imgsz
+        self.smoothing = smoothing
+        self.cooldown = cooldown
+        self.stride = 1
+        self.imgsz = imgsz
+        self.latency = None
+        self.tracking = False
+        self.frame_index = 0
+        self.samples = 0
+        self.last_decision = "start"
+
+    def should_detect(self):
+        self.frame_index += 1
+        return self.tracking or self.frame_index % self.stride == 0
+
+    def _decide(self, decision):
+        self.last_decision = decision
+        self.samples = 0
+        print(f"Scheduler: {decision} (latency {self.latency * 1000:.0f} ms, stride {self.stride}, imgsz {self.imgsz})")
+
+    def record(self, seconds, tracking=False):
+        self.latency = seconds if self.latency is None else (1 - self.smoothing) * self.latency + self.smoothing * seconds
+        self.samples += 1
+        if tracking != self.tracking:
+            self.tracking = tracking
+            if tracking and self.stride != 1:
+                self.stride = 1
+                self._decide("plate tracked, full rate")
+                return
+        if self.samples < self.cooldown:
+            return
+        stride = 1 if self.tracking else self.stride
+        per_frame = self.latency / stride
+        if per_frame > self.budget * 1.1:
+            # Shrink the input first; only skip frames once resolution is at its floor.
+            if self.imgsz > self.min_imgsz:
+                self.imgsz = max(self.min_imgsz, self.imgsz - 64)
+                self._decide("over budget, lower resolution")
+            elif not self.tracking and self.stride < self.max_stride:
+                self.stride += 1
+                self._decide("over budget, skip more frames")
+        elif per_frame < self.budget * 0.6:
+            if not self.tracking and self.stride > 1:
+                self.stride -= 1
+                self._decide("headroom, detect more frames")
+            elif self.imgsz < self.max_imgsz:
+                self.imgsz = min(self.max_imgsz, self.imgsz + 64)
+                self._decide("headroom, raise resolution")
+
+    def status(self):
+        return {
+            "stride": 1 if self.tracking else self.stride,
+            "imgsz": self.imgsz,
+            "latency_ms": round(self.latency * 1000, 1) if self.latency is not None else None,
+            "decision": self.last_decision,
+        }
@@ -0,0 +1,103 @@
+# tracking.py
+import itertools
+import threading
+from collections import Counter
+
+from config import TRACK_IOU_THRESHOLD, TRACK_MAX_MISSES, TRACK_MIN_VOTES, TRACK_MIN_AGREEMENT
+
+
+# Shared by every tracker in the process, so a track ID also identifies its plate across
+# webcam sessions, uploads and lanes (the OCR crop cache is scoped by it).
+_track_ids = itertools.count(1)
+
+
+def box_iou(a, b):
+    ix1, iy1 = max(a[0], b[0]), max(a[1], b[1])
+    ix2, iy2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0, ix2 - ix1) * max(0, iy2 - iy1)
+    if inter == 0:
+        return 0.0
+    area_a = (a[2] - a[0]) * (a[3] - a[1])
+    area_b = (b[2] - b[0]) * (b[3] - b[1])
+    return inter / float(area_a + area_b - inter)
+
+def centroid_distance(a, b):
+    ax, ay = (a[0] + a[2]) / 2, (a[1] + a[3]) / 2
+    bx, by = (b[0] + b[2]) / 2, (b[1] + b[3]) / 2
+    return ((ax - bx) ** 2 + (ay - by) ** 2) ** 0.5
+
+
+class Track:
+    def __init__(self, track_id, box, min_votes=TRACK_MIN_VOTES, min_agreement=TRACK_MIN_AGREEMENT):
+        self.track_id = track_id
+        self.box = box
+        self.min_votes = min_votes
+        self.min_agreement = min_agreement
+        self.votes = Counter()
+        self.misses = 0
+        self.hits = 1
+        self._lock = threading.Lock()
+
+    @property
+    def plate(self):
+        with self._lock:
+            if not self.votes:
+                return None
+            return self.votes.most_common(1)[0][0]
+
+    def add_vote(self, plate, weight=1.0):
+        with self._lock:
+            self.votes[plate] += weight
+
+    def is_confident(self):
+        with self._lock:
+            if not self.votes:
+                return False
+            count = self.votes.most_common(1)[0][1]
+            return count >= self.min_votes and count / sum(self.votes.values()) >= self.min_agreement
+
+
+class PlateTracker:
+    def __init__(self, iou_threshold=TRACK_IOU_THRESHOLD, max_misses=TRACK_MAX_MISSES,
+                 min_votes=TRACK_MIN_VOTES, min_agreement=TRACK_MIN_AGREEMENT):
+        self.iou_threshold = iou_threshold
+        self.max_misses = max_misses
+        self.min_votes = min_votes
+        self.min_agreement = min_agreement
+        self.tracks = []
+
+    def _candidates(self, detections):
+        pairs = []
+        for t, track in enumerate(self.tracks):
+            diagonal = ((track.box[2] - track.box[0]) ** 2 + (track.box[3] - track.box[1]) ** 2) ** 0.5
+            for d, detection in enumerate(detections):
+                box = detection[:4]
+                iou = box_iou(track.box, box)
+                # Fall back to centroid distance so a plate that moved during a detection gap keeps its track.
+                if iou >= self.iou_threshold or centroid_distance(track.box, box) <= diagonal / 2:
+                    pairs.append((iou, -centroid_distance(track.box, box), t, d))
+        pairs.sort(reverse=True)
+        return pairs
+
+    def update(self, detections):
+        assigned = [None] * len(detections)
+        matched_tracks = set()
+        for _, _, t, d in self._candidates(detections):
+            if t in matched_tracks or assigned[d] is not None:
+                continue
+            track = self.tracks[t]
+            track.box = tuple(detections[d][:4])
+            track.misses = 0
+            track.hits += 1
+            assigned[d] = track
+            matched_tracks.add(t)
+        for t, track in enumerate(self.tracks):
+            if t not in matched_tracks:
+                track.misses += 1
+        for d, detection in enumerate(detections):
+            if assigned[d] is None:
+                track = Track(next(_track_ids), tuple(detection[:4]), self.min_votes, self.min_agreement)
+                self.tracks.append(track)
+                assigned[d] = track
+        self.tracks = [track for track in self.tracks if track.misses <= self.max_misses]
+        return assigned
@@ -0,0 +1,96 @@
+# vehicle_io.py
+import csv
+import io
+import re
+
+from utils.database_utils import pooled_connection, invalidate_plate_index, PLATE_CHANNEL
+from utils.metrics import timed
+from utils.plate_formats import plate_validator
+
+VEHICLE_COLUMNS = ("name", "personalno", "passno", "vehicleno")
+
+EXPORT_QUERIES = {
+    "registeredvehicles": "SELECT name, personalno, passno, vehicleno FROM registeredvehicles ORDER BY vehicleno",
+    "visitor": "SELECT vehicleno, visitdate, visittime FROM visitor ORDER BY visitdate, visittime",
+}
+
+
+def normalize_plate(vehicle_no):
+    return re.sub(r"[\s\-.]", "", vehicle_no).upper()
+
+def _header_key(label):
+    # Accepts both the table's column names and the UI labels ("Vehicle No", "Pass No", ...).
+    key = re.sub(r"[\s_.\-]", "", label).lower()
+    return {"employeename": "name", "personalnumber": "personalno", "passnumber": "passno",
+            "vehiclenumber": "vehicleno", "plate": "vehicleno"}.get(key, key)
+
+def validate_vehicle_rows(lines, validator=plate_validator):
+    reader = csv.reader(lines)
+    header = next(reader, None)
+    if header is None:
+        return [], [(1, "file is empty")]
+    positions = {_header_key(label): i for i, label in enumerate(header)}
+    missing = [column for column in VEHICLE_COLUMNS if column not in positions]
+    if missing:
+        return [], [(1, f"missing column(s): {', '.join(missing)}")]
+    rows, errors, seen = [], [], {}
+    for record in reader:
+        line = reader.line_num
+        if not any(field.strip() for field in record):
+            continue
+        try:
+            name, personal_no, pass_no, vehicle_no = (record[positions[column]].strip() for column in VEHICLE_COLUMNS)
+        except IndexError:
+            errors.append((line, f"expected {len(header)} fields, got {len(record)}"))
+            continue
+        validated = validator.validate(vehicle_no)
+        vehicle_no = validated[0] if validated else normalize_plate(vehicle_no)
+        if not (name and personal_no and pass_no and vehicle_no):
+            errors.append((line, "empty field"))
+        elif not validated:
+            errors.append((line, f"invalid vehicle number {vehicle_no!r}"))
+        elif vehicle_no in seen:
+            errors.append((line, f"duplicate of line {seen[vehicle_no]} ({vehicle_no})"))
+        else:
+            seen[vehicle_no] = line
+            rows.append((name, personal_no, pass_no, vehicle_no))
+    return rows, errors
+
+def import_vehicles(lines, dry_run=False):
+    rows, errors = validate_vehicle_rows(lines)
+    report = {"rows": len(rows), "inserted": 0, "updated": 0, "unchanged": 0, "errors": errors}
+    if not rows or dry_run:
+        return report
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+    # COPY into a per-transaction staging table, then one set-based upsert into the real table.
+    with timed("vehicle_import"), pooled_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                "CREATE TEMP TABLE vehicle_import (name text, personalno text, passno text, vehicleno text) ON COMMIT DROP"
+            )
+            cursor.copy_expert("COPY vehicle_import (name, personalno, passno, vehicleno) FROM STDIN WITH (FORMAT csv)", buffer)
+            cursor.execute(
+                "INSERT INTO registeredvehicles (name, personalno, passno, vehicleno) "
+                "SELECT name, personalno, passno, vehicleno FROM vehicle_import "
+                "ON CONFLICT (vehicleno) DO UPDATE "
+                "SET name = EXCLUDED.name, personalno = EXCLUDED.personalno, passno = EXCLUDED.passno "
+                "WHERE (registeredvehicles.name, registeredvehicles.personalno, registeredvehicles.passno) "
+                "IS DISTINCT FROM (EXCLUDED.name, EXCLUDED.personalno, EXCLUDED.passno) "
+                "RETURNING xmax = 0"
+            )
+            outcomes = [inserted for inserted, in cursor.fetchall()]
+            if outcomes:
+                cursor.execute("SELECT pg_notify(%s, %s)", (PLATE_CHANNEL, "*"))
+    invalidate_plate_index()
+    report["inserted"] = sum(outcomes)
+    report["updated"] = len(outcomes) - report["inserted"]
+    report["unchanged"] = len(rows) - len(outcomes)
+    return report
+
+def export_table(table, out):
+    # COPY ... TO STDOUT streams straight into `out` (text or binary file) without building rows in Python.
+    with timed("export"), pooled_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.copy_expert(f"COPY ({EXPORT_QUERIES[table]}) TO STDOUT WITH (FORMAT csv, HEADER)", out)
@@ -0,0 +1,88 @@
+# visitor_writer.py
+import atexit
+import queue
+import threading
+import time
+from datetime import datetime
+
+import psycopg2
+from config import VISITOR_DEDUP_SECONDS, VISITOR_FLUSH_INTERVAL, VISITOR_BATCH_SIZE
+from utils.database_utils import add_visitor_entries
+
+
+class VisitorLogWriter:
+    def __init__(self, dedup_seconds=VISITOR_DEDUP_SECONDS, flush_interval=VISITOR_FLUSH_INTERVAL,
+                 batch_size=VISITOR_BATCH_SIZE):
+        self.dedup_seconds = dedup_seconds
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.queue = queue.Queue()
+        self.last_logged = {}
+        self.pending = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="visitor-log-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def log(self, vehicle_no, when=None):
+        now = time.monotonic()
+        with self._lock:
+            last = self.last_logged.get(vehicle_no)
+            if last is not None and now - last < self.dedup_seconds:
+                return False
+            self.last_logged[vehicle_no] = now
+            if len(self.last_logged) > 1024:
+                self.last_logged = {
+                    plate: seen for plate, seen in self.last_logged.items()
+                    if now - seen < self.dedup_seconds
+                }
+        when = when or datetime.now()
+        self.queue.put((vehicle_no, when.date(), when.time().strftime('%H:%M:%S')))
+        return True
+
+    def _drain(self, block):
+        try:
+            if block:
+                self.pending.append(self.queue.get(timeout=self.flush_interval))
+            while len(self.pending) < self.batch_size:
+                self.pending.append(self.queue.get_nowait())
+        except queue.Empty:
+            pass
+
+    def _flush(self):
+        if not self.pending:
+            return True
+        try:
+            add_visitor_entries(self.pending)
+        except psycopg2.Error as e:
+            print(f"Visitor log flush failed, {len(self.pending)} rows kept for retry: {e}")
+            return False
+        self.pending = []
+        return True
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._drain(block=True)
+            if not self._flush():
+                self._stop.wait(self.flush_interval)
+        while True:
+            self._drain(block=False)
+            if not self.pending or not self._flush():
+                break
+
+    def close(self, timeout=10):
+        self._stop.set()
+        self._thread.join(timeout)
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_visitor_writer():
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = VisitorLogWriter()
+        return _writer
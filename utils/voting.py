@@ -0,0 +1,101 @@
+# voting.py
+import time
+from collections import deque
+
+from config import VOTE_WINDOW_SECONDS, VOTE_HALF_LIFE, VOTE_ARRIVE_SCORE, VOTE_DEPART_SECONDS
+
+
+class PlateVoter:
+    # Sliding-window vote over recent reads. Each vote is weighted (detection confidence x
+    # OCR score x format weight) and decays with the given half-life; votes older than the
+    # window are dropped. Scores are stored pre-scaled by 2**(t / half_life) so decay costs
+    # nothing per vote; only the handful of plates inside the window are ever compared.
+    def __init__(self, window=VOTE_WINDOW_SECONDS, half_life=VOTE_HALF_LIFE, arrive_score=VOTE_ARRIVE_SCORE,
+                 depart_after=VOTE_DEPART_SECONDS, clock=time.monotonic):
+        self.window = window
+        self.half_life = half_life
+        self.arrive_score = arrive_score
+        self.depart_after = depart_after
+        self.clock = clock
+        self.votes = deque()
+        self.scores = {}
+        self.origin = None
+        self.leader = None
+        self.current = None
+        self.last_seen = None
+
+    def _scaled(self, weight, now):
+        return weight * 2.0 ** ((now - self.origin) / self.half_life)
+
+    def _rebase(self, now):
+        # Keep the exponent small; rescaling touches every live vote, but only once per ~30 half-lives.
+        factor = 2.0 ** (-(now - self.origin) / self.half_life)
+        self.votes = deque((t, plate, scaled * factor) for t, plate, scaled in self.votes)
+        self.scores = {plate: score * factor for plate, score in self.scores.items()}
+        self.origin = now
+
+    def score(self, plate, now=None):
+        now = self.clock() if now is None else now
+        if plate not in self.scores:
+            return 0.0
+        return self.scores[plate] * 2.0 ** (-(now - self.origin) / self.half_life)
+
+    def _evict(self, now):
+        evicted_leader = False
+        while self.votes and now - self.votes[0][0] > self.window:
+            _, plate, scaled = self.votes.popleft()
+            remaining = self.scores[plate] - scaled
+            if remaining <= 1e-12 * scaled:
+                del self.scores[plate]
+            else:
+                self.scores[plate] = remaining
+            evicted_leader |= plate == self.leader
+        if evicted_leader:
+            self.leader = max(self.scores, key=self.scores.get) if self.scores else None
+
+    def _event(self, kind, plate, now):
+        return {"event": kind, "plate": plate, "time": now, "score": round(self.score(plate, now), 3)}
+
+    def reset(self):
+        self.votes.clear()
+        self.scores.clear()
+        self.origin = None
+        self.leader = None
+        self.current = None
+        self.last_seen = None
+
+    def vote(self, plate, weight=1.0, now=None):
+        now = self.clock() if now is None else now
+        if self.origin is None:
+            self.origin = now
+        elif now - self.origin > 30 * self.half_life:
+            self._rebase(now)
+        scaled = self._scaled(weight, now)
+        self.votes.append((now, plate, scaled))
+        self.scores[plate] = self.scores.get(plate, 0.0) + scaled
+        if self.leader is None or self.scores[plate] > self.scores.get(self.leader, 0.0):
+            self.leader = plate
+        if plate == self.current:
+            self.last_seen = now
+        return self.update(now)
+
+    def update(self, now=None):
+        # Call once per frame, with or without reads, so departures are noticed.
+        now = self.clock() if now is None else now
+        events = []
+        self._evict(now)
+        if self.current is not None and now - self.last_seen > self.depart_after:
+            events.append(self._event("departed", self.current, now))
+            self.reset()
+            return events
+        if self.leader is None or self.leader == self.current or self.score(self.leader, now) < self.arrive_score:
+            return events
+        if self.current is not None:
+            # A different plate now clearly dominates: the next vehicle pulled up without a gap.
+            if self.score(self.leader, now) < 2 * self.score(self.current, now):
+                return events
+            events.append(self._event("departed", self.current, now))
+        self.current = self.leader
+        self.last_seen = now
+        events.append(self._event("arrived", self.current, now))
+        return events